@@ -0,0 +1,133 @@
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+
+import database_utils
+from database_utils import get_connection, insert_match, insert_team_and_stats, insert_player_and_stats, \
+    save_match_results, delete_match, close_connection_pool
+from video_storage import LocalVideoStorage
+
+
+def make_match_stats(num_players=22):
+    stats = {
+        'team_possession': {'team1': 54.3, 'team2': 45.7},
+        'players': {}
+    }
+    for player_number in range(1, num_players + 1):
+        team = 1 if player_number <= num_players // 2 else 2
+        stats['players'][player_number] = {
+            'avg_speed': random.uniform(4, 12),
+            'total_distance': random.uniform(20, 120),
+            'team': team,
+            'team_color': (255, 255, 255) if team == 1 else (40, 200, 40)
+        }
+    return stats
+
+
+def make_videos(count, video_kb):
+    # every run gets its own video, as every processed match does, so the content store never dedups them
+    return [os.urandom(video_kb * 1024) for _ in range(count)]
+
+
+def save_match_results_per_row(video_bytes, video_name, stats):
+    match_id = insert_match(video_bytes, video_name)
+    team1_id = insert_team_and_stats(match_id, '255,255,255', int(stats['team_possession']['team1']))
+    team2_id = insert_team_and_stats(match_id, '40,200,40', int(stats['team_possession']['team2']))
+    for player_number, player_stats in stats['players'].items():
+        team_id = team1_id if player_stats['team'] == 1 else team2_id
+        insert_player_and_stats(
+            team_id, match_id, int(player_number), player_stats['total_distance'], player_stats['avg_speed']
+        )
+    return match_id
+
+
+@contextmanager
+def fresh_connection():
+    conn = get_connection()
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def save_match_results_connect_per_call(video_bytes, video_name, stats):
+    # before pooling every insert function opened and closed its own connection
+    pooled_connection = database_utils.pooled_connection
+    database_utils.pooled_connection = fresh_connection
+    try:
+        return save_match_results_per_row(video_bytes, video_name, stats)
+    finally:
+        database_utils.pooled_connection = pooled_connection
+
+
+def save_match_results_with_video(video_storage, video_path, video_name, stats):
+    # the worker stores the encoded video before it saves the match, so that write belongs to the same path
+    video_ref = video_storage.put_file(video_path, move=True)
+    return save_match_results(video_ref, video_name, stats)
+
+
+def measure_connect():
+    start = time.perf_counter()
+    conn = get_connection()
+    conn.close()
+    return time.perf_counter() - start
+
+
+def measure(func, calls):
+    timings = []
+    match_ids = []
+    for args in calls:
+        start = time.perf_counter()
+        match_ids.append(func(*args))
+        timings.append(time.perf_counter() - start)
+    for match_id in match_ids:
+        if match_id is not None:
+            delete_match(match_id)
+    return timings
+
+
+def report(name, timings):
+    timings_ms = sorted(t * 1000 for t in timings)
+    p95 = timings_ms[min(len(timings_ms) - 1, int(len(timings_ms) * 0.95))]
+    print(f'{name:<36} median {statistics.median(timings_ms):8.2f} ms   p95 {p95:8.2f} ms   n={len(timings_ms)}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Latency of writing one processed match to PostgreSQL')
+    parser.add_argument('--players', type=int, default=22)
+    parser.add_argument('--repeats', type=int, default=30)
+    parser.add_argument('--video-kb', type=int, default=256)
+    args = parser.parse_args()
+
+    stats = make_match_stats(args.players)
+
+    report('psycopg2.connect + close', [measure_connect() for _ in range(args.repeats)])
+    report('per-row inserts (connect per call)', measure(
+        save_match_results_connect_per_call, [(video, 'bench_per_call.mp4', stats) for video in make_videos(args.repeats, args.video_kb)]
+    ))
+    report('per-row inserts (pooled)', measure(
+        save_match_results_per_row, [(video, 'bench_per_row.mp4', stats) for video in make_videos(args.repeats, args.video_kb)]
+    ))
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        video_storage = LocalVideoStorage(os.path.join(temp_dir, 'video_store'))
+        video_paths = []
+        for i, video in enumerate(make_videos(args.repeats, args.video_kb)):
+            video_paths.append(os.path.join(temp_dir, f'{i}.mp4'))
+            with open(video_paths[-1], 'wb') as f:
+                f.write(video)
+
+        report('video store + save_match_results', measure(
+            save_match_results_with_video,
+            [(video_storage, video_path, 'bench_bulk.mp4', stats) for video_path in video_paths]
+        ))
+
+    close_connection_pool()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+import argparse
+import importlib.util
+import io
+import multiprocessing
+import os
+import random
+import resource
+import tempfile
+import time
+import uuid
+
+from database_utils import pooled_connection, delete_match, fetch_all_playerstats, close_connection_pool
+from stats_exporter import StatsExporter
+
+
+class SyntheticRowsFile(io.RawIOBase):
+    def __init__(self, make_line, row_count):
+        self.make_line = make_line
+        self.row_count = row_count
+        self.row_num = 0
+        self.buffer = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while len(self.buffer) < len(b) and self.row_num < self.row_count:
+            next_row_num = min(self.row_num + 1000, self.row_count)
+            self.buffer += ''.join(self.make_line(i) for i in range(self.row_num, next_row_num)).encode()
+            self.row_num = next_row_num
+        size = min(len(b), len(self.buffer))
+        b[:size] = self.buffer[:size]
+        self.buffer = self.buffer[size:]
+        return size
+
+
+def seed_rows(row_count):
+    match_id = str(uuid.uuid4())
+    team_ids = [str(uuid.uuid4()), str(uuid.uuid4())]
+    player_ids = [str(uuid.uuid4()) for _ in range(row_count)]
+
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "INSERT INTO match_info (match_id, match_video_name, processed_match_video) VALUES (%s, %s, %s);",
+            (match_id, 'bench_export.mp4', b'')
+        )
+        for team_id in team_ids:
+            cur.execute("INSERT INTO team (team_id, match_id, team_color) VALUES (%s, %s, %s);",
+                        (team_id, match_id, '0,0,0'))
+            cur.execute("INSERT INTO teamstats (team_id, match_id, ball_possession) VALUES (%s, %s, %s);",
+                        (team_id, match_id, 50))
+
+        cur.copy_expert(
+            "COPY player (player_id, team_id, match_id, player_number) FROM STDIN",
+            SyntheticRowsFile(lambda i: f'{player_ids[i]}\t{team_ids[i % 2]}\t{match_id}\t{i}\n', row_count)
+        )
+        cur.copy_expert(
+            "COPY playerstats (player_id, team_id, match_id, distance, avg_speed) FROM STDIN",
+            SyntheticRowsFile(
+                lambda i: f'{player_ids[i]}\t{team_ids[i % 2]}\t{match_id}\t'
+                          f'{random.uniform(0, 150):.4f}\t{random.uniform(0, 30):.4f}\n',
+                row_count
+            )
+        )
+        conn.commit()
+        cur.close()
+
+    return match_id
+
+
+def run_streaming_export(output_path, fetch_size, result_queue):
+    start = time.perf_counter()
+    row_count = StatsExporter(fetch_size).export('playerstats', output_path)
+    result_queue.put((row_count, time.perf_counter() - start, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss))
+
+
+def run_fetch_all(output_path, fetch_size, result_queue):
+    start = time.perf_counter()
+    row_count = len(fetch_all_playerstats())
+    result_queue.put((row_count, time.perf_counter() - start, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss))
+
+
+def measure(target, output_path, fetch_size):
+    result_queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=target, args=(output_path, fetch_size, result_queue))
+    process.start()
+    result = result_queue.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Memory and throughput of exporting playerstats')
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--fetch-sizes', type=int, nargs='+', default=[2000, 10000, 50000])
+    parser.add_argument('--skip-fetch-all', action='store_true')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    match_id = seed_rows(args.rows)
+    close_connection_pool()
+    print(f'Seeded {args.rows} synthetic playerstats rows in {time.perf_counter() - start:.1f} s')
+
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            extensions = ['csv']
+            if importlib.util.find_spec('pyarrow') is not None:
+                extensions.append('parquet')
+            else:
+                print('pyarrow is not installed, skipping Parquet export')
+
+            for fetch_size in args.fetch_sizes:
+                for extension in extensions:
+                    output_path = os.path.join(temp_dir, f'playerstats.{extension}')
+                    row_count, elapsed, max_rss_kb = measure(run_streaming_export, output_path, fetch_size)
+                    print(f'stream {extension:<8} fetch_size={fetch_size:<6} {row_count} rows  {elapsed:6.2f} s  '
+                          f'{row_count / elapsed:10.0f} rows/s  peak RSS {max_rss_kb / 1024:7.1f} MB')
+
+            if not args.skip_fetch_all:
+                row_count, elapsed, max_rss_kb = measure(run_fetch_all, None, None)
+                print(f'fetch_all_playerstats            {row_count} rows  {elapsed:6.2f} s  '
+                      f'{row_count / elapsed:10.0f} rows/s  peak RSS {max_rss_kb / 1024:7.1f} MB')
+    finally:
+        delete_match(match_id)
+        close_connection_pool()
+
+
+if __name__ == '__main__':
+    main()
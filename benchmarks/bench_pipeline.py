@@ -0,0 +1,141 @@
+import argparse
+import copy
+import json
+import os
+import statistics
+import sys
+import time
+
+from pipeline import calculate_statistics
+from pipeline.match_pipeline import (
+    estimate_camera_movement, adjust_positions, transform_positions, estimate_speed_and_distance, assign_teams,
+    assign_ball_control
+)
+from pipeline.profiler import get_git_revision
+from trackers import Tracker
+from view_transformer import ViewTransformer
+from speed_and_distance_estimator import SpeedAndDistanceEstimator
+from player_ball_assigner import PlayerBallAssigner
+from .synthetic_video import generate_synthetic_match, load_stub_match
+
+THRESHOLDS_PATH = os.path.join(os.path.dirname(__file__), 'pipeline_thresholds.json')
+
+
+def run_stages(frames, tracks, camera_movement):
+    timings = {}
+
+    def timed(name, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        timings[name] = time.perf_counter() - start
+        return result
+
+    view_transformer = ViewTransformer()
+    speed_and_distance_estimator = SpeedAndDistanceEstimator()
+
+    timed('camera_movement', estimate_camera_movement, frames)
+    timed('add_positions', Tracker.add_position_to_tracks, tracks)
+    tracks = timed('camera_adjust', adjust_positions, tracks, (camera_movement, None))
+    tracks = timed('view_transform', transform_positions, tracks, view_transformer.pixel_vertices.tolist())
+    tracks = timed(
+        'speed_and_distance', estimate_speed_and_distance, tracks,
+        speed_and_distance_estimator.frame_window, speed_and_distance_estimator.frame_rate
+    )
+    team_assignment = timed('team_assignment', assign_teams, frames, tracks)
+    ball_control = timed(
+        'ball_assignment', assign_ball_control, tracks, team_assignment,
+        PlayerBallAssigner().max_player_ball_distance
+    )
+    output_frames = timed('draw_annotations', Tracker.draw_annotations, frames, *ball_control)
+    timed('draw_speed_and_distance', speed_and_distance_estimator.draw_speed_and_distance, output_frames, tracks)
+    timed('statistics', calculate_statistics, ball_control)
+
+    return timings
+
+
+def benchmark_length(source, frame_count, repeats, seed):
+    if source == 'stubs':
+        frames, tracks, camera_movement = load_stub_match(frame_count)
+    else:
+        frames, tracks, camera_movement = generate_synthetic_match(frame_count, seed=seed)
+
+    stage_timings = {}
+    for _ in range(repeats):
+        for name, elapsed in run_stages(frames, copy.deepcopy(tracks), camera_movement).items():
+            stage_timings.setdefault(name, []).append(elapsed)
+
+    return {name: statistics.median(timings) for name, timings in stage_timings.items()}
+
+
+def find_regressions(results, baseline, thresholds):
+    regressions = []
+    min_delta = thresholds.get('min_delta_ms', 0) / 1000
+
+    for frame_count, stage_seconds in results['lengths'].items():
+        baseline_seconds = baseline['lengths'].get(frame_count)
+        if baseline_seconds is None:
+            continue
+
+        for name, elapsed in stage_seconds.items():
+            if name not in baseline_seconds:
+                continue
+            threshold = thresholds.get('stages', {}).get(name, thresholds.get('default', 0.25))
+            limit = baseline_seconds[name] * (1 + threshold)
+            if elapsed > limit and elapsed - baseline_seconds[name] > min_delta:
+                regressions.append((frame_count, name, baseline_seconds[name], elapsed, threshold))
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time the downstream pipeline stages on synthetic or stub videos')
+    parser.add_argument('--source', choices=['synthetic', 'stubs'], default='synthetic')
+    parser.add_argument('--lengths', type=int, nargs='+', default=[50, 100, 200])
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the results as JSON, e.g. to use as a later baseline')
+    parser.add_argument('--baseline', help='results JSON of an earlier run to check for regressions')
+    parser.add_argument('--thresholds', default=THRESHOLDS_PATH)
+    args = parser.parse_args()
+
+    results = {
+        'source': args.source,
+        'git_revision': get_git_revision(),
+        'repeats': args.repeats,
+        'lengths': {}
+    }
+
+    for frame_count in args.lengths:
+        stage_seconds = benchmark_length(args.source, frame_count, args.repeats, args.seed)
+        results['lengths'][str(frame_count)] = stage_seconds
+
+        print(f'{args.source}, {frame_count} frames')
+        for name, elapsed in stage_seconds.items():
+            print(f'  {name:<24}{elapsed * 1000:10.1f} ms{elapsed / frame_count * 1000:10.3f} ms/frame')
+        print(f'  {"total":<24}{sum(stage_seconds.values()) * 1000:10.1f} ms')
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.thresholds) as f:
+            thresholds = json.load(f)
+
+        if baseline.get('source') != args.source:
+            print(f'Baseline was recorded on {baseline.get("source")} input, not {args.source}')
+            sys.exit(2)
+
+        regressions = find_regressions(results, baseline, thresholds)
+        for frame_count, name, before, after, threshold in regressions:
+            print(f'REGRESSION {name} at {frame_count} frames: {before * 1000:.1f} ms -> {after * 1000:.1f} ms '
+                  f'(+{(after - before) / before * 100:.0f}%, allowed +{threshold * 100:.0f}%)')
+        if regressions:
+            sys.exit(1)
+        print(f'No stage regressed against {args.baseline} (git revision {baseline.get("git_revision")})')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+MAIN_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'main.py')
+
+
+def get_import_times(stderr, top):
+    import_times = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, name = line[len('import time:'):].split('|')
+        if name.startswith('  '):
+            continue
+        import_times.append((int(cumulative_us), name.strip()))
+    return sorted(import_times, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure GUI cold start: seconds until the first window is shown')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--importtime', type=int, default=0, metavar='N',
+                        help='also list the N slowest top-level imports of the last run')
+    args = parser.parse_args()
+
+    env = dict(os.environ, exit_after_startup='1')
+    env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        env['startup_report_path'] = os.path.join(temp_dir, 'startup.jsonl')
+        command = [sys.executable] + (['-X', 'importtime'] if args.importtime else []) + [MAIN_PATH]
+
+        for _ in range(args.runs):
+            result = subprocess.run(command, env=env, cwd=os.path.dirname(MAIN_PATH), capture_output=True, text=True)
+            if result.returncode != 0:
+                print(result.stdout, result.stderr, sep='\n')
+                sys.exit(result.returncode)
+
+        with open(env['startup_report_path']) as f:
+            records = [json.loads(line) for line in f]
+
+    seconds = [record['seconds_to_first_window'] for record in records]
+    print(f'time to first window over {len(seconds)} runs: median {statistics.median(seconds):.2f} s, '
+          f'min {min(seconds):.2f} s, max {max(seconds):.2f} s')
+
+    heavy_modules = sorted({name for record in records for name in record['heavy_modules']})
+    if heavy_modules:
+        print(f'analysis modules loaded before the first window: {", ".join(heavy_modules)}')
+
+    if args.importtime:
+        for cumulative_us, name in get_import_times(result.stderr, args.importtime):
+            print(f'  {cumulative_us / 1000:8.1f} ms  {name}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,342 @@
+import argparse
+import copy
+import hashlib
+import numbers
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from pipeline import StageGraph, calculate_statistics
+from pipeline.match_pipeline import (
+    detect_objects, adjust_positions, transform_positions, estimate_speed_and_distance, assign_teams,
+    assign_ball_control
+)
+from trackers import Tracker
+from camera_movement_estimator import CameraMovementEstimator
+from view_transformer import ViewTransformer
+from speed_and_distance_estimator import SpeedAndDistanceEstimator
+from player_ball_assigner import PlayerBallAssigner
+from .synthetic_video import generate_synthetic_match, load_stub_match
+
+# stand-in for model latency, so reused detections are weighed against the thumbnail comparison they cost
+STUB_INFERENCE_SECONDS = 0.02
+# the threshold the match pipeline passes to duplicate detection
+DUPLICATE_THRESHOLD = 6
+DUPLICATED_FEED_FRAMES = 48
+
+
+def get_default_params():
+    speed_and_distance_estimator = SpeedAndDistanceEstimator()
+    return {
+        'pixel_vertices': ViewTransformer().pixel_vertices.tolist(),
+        'frame_window': speed_and_distance_estimator.frame_window,
+        'frame_rate': speed_and_distance_estimator.frame_rate,
+        'max_player_ball_distance': PlayerBallAssigner().max_player_ball_distance,
+    }
+
+
+def calculate_statistics_reference(tracks, team_ball_control):
+    total_frames = len(team_ball_control)
+    possession = {
+        'team1': (team_ball_control == 1).sum() / total_frames * 100 if total_frames > 0 else 0,
+        'team2': (team_ball_control == 2).sum() / total_frames * 100 if total_frames > 0 else 0,
+    }
+
+    speeds = {}
+    last_distance = {}
+    last_track = {}
+    for frame in tracks['players']:
+        for player_id, track in frame.items():
+            if 'speed' in track:
+                speeds.setdefault(player_id, []).append(track['speed'])
+            if 'distance' in track:
+                last_distance[player_id] = track['distance']
+            last_track[player_id] = track
+
+    players = {}
+    for player_id, track in last_track.items():
+        if 'team' not in track:
+            continue
+        player_speeds = speeds.get(player_id, [])
+        players[int(player_id)] = {
+            'avg_speed': sum(player_speeds) / len(player_speeds) if player_speeds else 0,
+            'max_speed': max(player_speeds) if player_speeds else 0,
+            'total_distance': last_distance.get(player_id, 0),
+            'team': track['team'],
+            'team_color': track.get('team_color', (0, 0, 0))
+        }
+
+    return {'team_possession': possession, 'players': players}
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def analyse_reference(frames, tracks, camera_movement):
+    params = get_default_params()
+
+    Tracker.add_position_to_tracks(tracks)
+    tracks = adjust_positions(tracks, (camera_movement, None))
+    tracks = transform_positions(tracks, params['pixel_vertices'])
+    tracks = estimate_speed_and_distance(tracks, params['frame_window'], params['frame_rate'])
+    team_assignment = assign_teams(frames, tracks)
+    tracks, team_ball_control = assign_ball_control(tracks, team_assignment, params['max_player_ball_distance'])
+
+    return {
+        'tracks': tracks,
+        'team_assignment': team_assignment,
+        'team_ball_control': team_ball_control,
+        'statistics': calculate_statistics_reference(tracks, team_ball_control),
+    }
+
+
+def run_reference(frames, tracks, camera_movement):
+    return timed(analyse_reference, frames, tracks, camera_movement)
+
+
+def build_stub_graph(frames, tracks, camera_movement, cache_dir):
+    params = get_default_params()
+
+    def load_tracks():
+        stub_tracks = copy.deepcopy(tracks)
+        Tracker.add_position_to_tracks(stub_tracks)
+        return stub_tracks
+
+    graph = StageGraph(cache_dir)
+    graph.add_stage('decode', lambda: frames, persist=False)
+    graph.add_stage('track', load_tracks)
+    graph.add_stage('camera_motion', lambda: (camera_movement, None))
+    graph.add_stage('positioning', adjust_positions, inputs=['track', 'camera_motion'], mutates=['track'])
+    graph.add_stage(
+        'view_transform', transform_positions, inputs=['positioning'],
+        params={'pixel_vertices': params['pixel_vertices']}, mutates=['positioning']
+    )
+    graph.add_stage(
+        'speed_and_distance', estimate_speed_and_distance, inputs=['view_transform'],
+        params={'frame_window': params['frame_window'], 'frame_rate': params['frame_rate']},
+        mutates=['view_transform']
+    )
+    graph.add_stage('team_assignment', assign_teams, inputs=['decode', 'track'])
+    graph.add_stage(
+        'possession', assign_ball_control, inputs=['speed_and_distance', 'team_assignment'],
+        params={'max_player_ball_distance': params['max_player_ball_distance']},
+        mutates=['speed_and_distance']
+    )
+    graph.add_stage('statistics', calculate_statistics, inputs=['possession'])
+
+    return graph
+
+
+def get_graph_result(graph):
+    tracks, team_ball_control = graph.run('possession')
+    return {
+        'tracks': tracks,
+        'team_assignment': graph.run('team_assignment'),
+        'team_ball_control': team_ball_control,
+        'statistics': graph.run('statistics'),
+    }
+
+
+def run_stage_graph(frames, tracks, camera_movement):
+    with tempfile.TemporaryDirectory() as cache_dir:
+        return timed(get_graph_result, build_stub_graph(frames, tracks, camera_movement, cache_dir))
+
+
+def run_stage_graph_cached(frames, tracks, camera_movement):
+    with tempfile.TemporaryDirectory() as cache_dir:
+        get_graph_result(build_stub_graph(frames, copy.deepcopy(tracks), camera_movement, cache_dir))
+        graph = build_stub_graph(frames, tracks, camera_movement, cache_dir)
+        # only the second run is timed, the first one just fills the cache
+        result, seconds = timed(get_graph_result, graph)
+        if graph.computed_stages:
+            raise RuntimeError(f'Stages were recomputed instead of loaded from cache: {graph.computed_stages}')
+        return result, seconds
+
+
+def run_statistics_reference(frames, tracks, camera_movement):
+    analysed = analyse_reference(frames, tracks, camera_movement)
+    return timed(calculate_statistics_reference, analysed['tracks'], analysed['team_ball_control'])
+
+
+def run_player_statistics(frames, tracks, camera_movement):
+    analysed = analyse_reference(frames, tracks, camera_movement)
+    return timed(calculate_statistics, (analysed['tracks'], analysed['team_ball_control']))
+
+
+def run_camera_motion_reference(frames, tracks, camera_movement):
+    camera_movement_estimator = CameraMovementEstimator(frames[0], gate_static_frames=False)
+    return timed(camera_movement_estimator.get_camera_movement, frames)
+
+
+def run_camera_motion(frames, tracks, camera_movement):
+    return timed(CameraMovementEstimator(frames[0]).get_camera_movement, frames)
+
+
+def get_frame_key(frame):
+    return hashlib.blake2b(np.ascontiguousarray(frame), digest_size=16).digest()
+
+
+class StubDetector:
+    """Answers every frame with the stub boxes of the frame it was rendered from."""
+
+    def __init__(self):
+        self.boxes = {}
+        self.batch_sizer = None
+
+    def add_frame(self, frame, tracks, frame_num):
+        # a detector only sees whole pixels, and reports objects in no particular track order
+        self.boxes[get_frame_key(frame)] = sorted(
+            (object, [round(value) for value in track['bbox']]) for object in ('players', 'referees', 'ball')
+            for track in tracks[object][frame_num].values()
+        )
+
+    def get_class_names(self):
+        return {0: 'ball', 1: 'goalkeeper', 2: 'player', 3: 'referee'}
+
+    def detect_frames(self, frames, progress_callback=None, batch_size=None):
+        time.sleep(STUB_INFERENCE_SECONDS * len(frames))
+        return [self.boxes[get_frame_key(frame)] for frame in frames]
+
+
+def build_duplicated_feed(frames, tracks):
+    rng = np.random.default_rng(0)
+    detector = StubDetector()
+    feed = []
+
+    def add(frame, frame_num):
+        detector.add_frame(frame, tracks, frame_num)
+        feed.append(frame)
+
+    def add_resent(frame, frame_num):
+        # a re-encoded repeat is never byte-identical to the frame it repeats
+        noise = rng.integers(-2, 3, frame.shape, dtype=np.int16)
+        add(np.clip(frame + noise, 0, 255).astype(np.uint8), frame_num)
+
+    frame_count = min(len(frames), DUPLICATED_FEED_FRAMES)
+    for frame_num in range(frame_count):
+        add(frames[frame_num], frame_num)
+        # every fourth frame is sent twice, as after a 24 to 30 fps conversion
+        if frame_num % 4 == 0:
+            add_resent(frames[frame_num], frame_num)
+        # and a replay cut freezes the picture halfway through
+        if frame_num == frame_count // 2:
+            for _ in range(12):
+                add_resent(frames[frame_num], frame_num)
+
+    return feed, detector
+
+
+def run_detection_reference(frames, tracks, camera_movement):
+    feed, detector = build_duplicated_feed(frames, tracks)
+    return timed(lambda: [detector.detect_frames([frame])[0] for frame in feed])
+
+
+def run_duplicate_frames(frames, tracks, camera_movement):
+    feed, detector = build_duplicated_feed(frames, tracks)
+    (detections, _, _), seconds = timed(detect_objects, feed, None, None, None, DUPLICATE_THRESHOLD, detector)
+    return detections, seconds
+
+
+# each mode runs its own reference, since the approximate paths replace different parts of the pipeline
+MODES = {
+    'stage_graph': (run_reference, run_stage_graph),
+    'stage_graph_cached': (run_reference, run_stage_graph_cached),
+    'player_statistics': (run_statistics_reference, run_player_statistics),
+    'duplicate_frames': (run_detection_reference, run_duplicate_frames),
+    'camera_motion': (run_camera_motion_reference, run_camera_motion),
+}
+
+# reused detections may lag a nearly still player by the one pixel the thumbnail comparison cannot see
+MODE_ATOL = {
+    'duplicate_frames': 1,
+}
+
+
+def compare(reference, candidate, path, rtol, atol, differences):
+    if isinstance(reference, dict) and isinstance(candidate, dict):
+        for key in reference.keys() | candidate.keys():
+            if key not in candidate:
+                differences.append((f'{path}[{key!r}]', 'missing', None))
+            elif key not in reference:
+                differences.append((f'{path}[{key!r}]', 'unexpected', None))
+            else:
+                compare(reference[key], candidate[key], f'{path}[{key!r}]', rtol, atol, differences)
+    elif isinstance(reference, (list, tuple, np.ndarray)) and isinstance(candidate, (list, tuple, np.ndarray)):
+        if len(reference) != len(candidate):
+            differences.append((path, f'length {len(reference)} != {len(candidate)}', None))
+            return
+        if isinstance(reference, np.ndarray) and reference.dtype != object:
+            reference_array = reference.astype(float)
+            candidate_array = np.asarray(candidate, dtype=float)
+            if not np.allclose(reference_array, candidate_array, rtol=rtol, atol=atol, equal_nan=True):
+                error = float(np.nanmax(np.abs(reference_array - candidate_array)))
+                differences.append((path, f'max abs error {error:.3g}', error))
+            return
+        for i, (reference_item, candidate_item) in enumerate(zip(reference, candidate)):
+            compare(reference_item, candidate_item, f'{path}[{i}]', rtol, atol, differences)
+    elif isinstance(reference, numbers.Number) and isinstance(candidate, numbers.Number) \
+            and not isinstance(reference, bool):
+        if not np.isclose(float(reference), float(candidate), rtol=rtol, atol=atol, equal_nan=True):
+            error = abs(float(reference) - float(candidate))
+            differences.append((path, f'{reference} != {candidate}', error))
+    elif (reference is None) != (candidate is None) or reference != candidate:
+        differences.append((path, f'{reference!r} != {candidate!r}', None))
+
+
+def timed_run(func, frames, tracks, camera_movement):
+    tracks = copy.deepcopy(tracks)
+    # TeamAssigner's KMeans draws its initial centres from the global numpy random state
+    np.random.seed(0)
+    return func(frames, tracks, camera_movement)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Check that accelerated pipeline modes match the reference implementation on recorded stubs'
+    )
+    parser.add_argument('--source', choices=['stubs', 'synthetic'], default='stubs')
+    parser.add_argument('--frames', type=int, default=146)
+    parser.add_argument('--modes', nargs='+', choices=list(MODES), default=list(MODES))
+    parser.add_argument('--rtol', type=float, default=1e-6)
+    parser.add_argument('--atol', type=float, default=1e-6)
+    parser.add_argument('--show', type=int, default=10, help='differences to print per mode')
+    args = parser.parse_args()
+
+    if args.source == 'stubs':
+        frames, tracks, camera_movement = load_stub_match(args.frames)
+    else:
+        frames, tracks, camera_movement = generate_synthetic_match(args.frames)
+
+    # the analysis modules are imported lazily, so the first run would also pay for their imports
+    timed_run(run_reference, frames, tracks, camera_movement)
+
+    failed = False
+    for mode in args.modes:
+        run_mode_reference, run_mode = MODES[mode]
+        reference, reference_seconds = timed_run(run_mode_reference, frames, tracks, camera_movement)
+        result, seconds = timed_run(run_mode, frames, tracks, camera_movement)
+
+        differences = []
+        compare(reference, result, mode, args.rtol, max(args.atol, MODE_ATOL.get(mode, 0)), differences)
+
+        errors = [error for _, _, error in differences if error is not None]
+        max_error = f'max abs error {max(errors):.3g}' if errors else ''
+        status = 'OK' if not differences else f'{len(differences)} differences {max_error}'
+        print(f'{mode:<24}reference {reference_seconds * 1000:8.1f} ms  mode {seconds * 1000:8.1f} ms  '
+              f'speedup {reference_seconds / seconds:5.2f}x  {status}')
+        for path, description, _ in differences[:args.show]:
+            print(f'    {path}: {description}')
+
+        failed = failed or bool(differences)
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
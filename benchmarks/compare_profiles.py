@@ -0,0 +1,52 @@
+import argparse
+import json
+
+
+def load_stages(profile_path):
+    with open(profile_path) as f:
+        profile = json.load(f)
+    return profile, {stage['name']: stage for stage in profile['stages']}
+
+
+def format_change(before, after):
+    if before is None or after is None:
+        return '-'
+    if before == 0:
+        return 'n/a'
+    return f'{(after - before) / before * 100:+.1f}%'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare two per-job JSON profiles stage by stage')
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    args = parser.parse_args()
+
+    baseline, baseline_stages = load_stages(args.baseline)
+    candidate, candidate_stages = load_stages(args.candidate)
+
+    print(f'baseline  {baseline.get("git_revision")}  {baseline["video_path"]}  {baseline["frame_count"]} frames')
+    print(f'candidate {candidate.get("git_revision")}  {candidate["video_path"]}  {candidate["frame_count"]} frames')
+    print(f'{"stage":<20}{"wall before":>12}{"wall after":>12}{"change":>10}{"cpu change":>12}{"rss change":>12}')
+
+    names = list(baseline_stages) + [name for name in candidate_stages if name not in baseline_stages]
+    for name in names:
+        before = baseline_stages.get(name, {})
+        after = candidate_stages.get(name, {})
+        wall_before = before.get('wall_seconds')
+        wall_after = after.get('wall_seconds')
+        print(
+            f'{name:<20}'
+            f'{wall_before if wall_before is not None else float("nan"):>12.3f}'
+            f'{wall_after if wall_after is not None else float("nan"):>12.3f}'
+            f'{format_change(wall_before, wall_after):>10}'
+            f'{format_change(before.get("cpu_seconds"), after.get("cpu_seconds")):>12}'
+            f'{format_change(before.get("peak_rss_mb"), after.get("peak_rss_mb")):>12}'
+        )
+
+    print(f'{"total":<20}{baseline["total_wall_seconds"]:>12.3f}{candidate["total_wall_seconds"]:>12.3f}'
+          f'{format_change(baseline["total_wall_seconds"], candidate["total_wall_seconds"]):>10}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+import os
+import pickle
+
+import cv2
+import numpy as np
+
+from track_store import load_tracks, load_camera_movement
+
+FRAME_WIDTH = 1920
+FRAME_HEIGHT = 1080
+CAMERA_MARGIN = 120
+
+PITCH_COLOR = (60, 140, 60)
+TEAM_SHIRT_COLORS = {1: (235, 235, 235), 2: (40, 40, 200)}
+REFEREE_SHIRT_COLOR = (20, 200, 230)
+SHORTS_COLOR = (30, 30, 30)
+
+
+def make_pitch(width, height, rng):
+    pitch = np.empty((height, width, 3), dtype=np.uint8)
+    pitch[:] = PITCH_COLOR
+    for x in range(0, width, 160):
+        pitch[:, x:x + 80] = (70, 155, 70)
+
+    noise = rng.normal(0, 10, (height, width, 1))
+    pitch = np.clip(pitch + noise, 0, 255).astype(np.uint8)
+
+    line_color = (245, 245, 245)
+    cv2.rectangle(pitch, (40, 40), (width - 40, height - 40), line_color, 4)
+    cv2.line(pitch, (width // 2, 40), (width // 2, height - 40), line_color, 4)
+    cv2.circle(pitch, (width // 2, height // 2), 160, line_color, 4)
+    cv2.rectangle(pitch, (40, height // 2 - 250), (300, height // 2 + 250), line_color, 4)
+    cv2.rectangle(pitch, (width - 300, height // 2 - 250), (width - 40, height // 2 + 250), line_color, 4)
+
+    return pitch
+
+
+def get_camera_offsets(frame_count, frame_rate=24):
+    t = np.arange(frame_count)
+    offset_x = CAMERA_MARGIN + np.round(CAMERA_MARGIN * 0.8 * np.sin(2 * np.pi * t / (frame_rate * 10)))
+    offset_y = CAMERA_MARGIN + np.round(CAMERA_MARGIN * 0.3 * np.sin(2 * np.pi * t / (frame_rate * 14)))
+    return np.stack([offset_x, offset_y], axis=1).astype(int)
+
+
+def get_camera_movement(camera_offsets):
+    camera_movement = [[0, 0]]
+    for previous, current in zip(camera_offsets[:-1], camera_offsets[1:]):
+        camera_movement.append([float(current[0] - previous[0]), float(current[1] - previous[1])])
+    return camera_movement
+
+
+def random_walk(frame_count, count, low, high, max_speed, rng):
+    positions = np.empty((frame_count, count, 2))
+    position = rng.uniform(low, high, (count, 2))
+    velocity = rng.normal(0, max_speed / 2, (count, 2))
+
+    for frame_num in range(frame_count):
+        velocity = 0.9 * velocity + rng.normal(0, max_speed / 4, (count, 2))
+        velocity = np.clip(velocity, -max_speed, max_speed)
+        position = np.clip(position + velocity, low, high)
+        velocity[(position == low) | (position == high)] *= -1
+        positions[frame_num] = position
+
+    return positions
+
+
+def get_bbox(foot_position):
+    x, y = foot_position
+    height = 40 + 70 * y / FRAME_HEIGHT
+    width = height * 0.45
+    return [x - width / 2, y - height, x + width / 2, y]
+
+
+def is_visible(bbox):
+    return bbox[0] >= 0 and bbox[1] >= 0 and bbox[2] < FRAME_WIDTH and bbox[3] < FRAME_HEIGHT
+
+
+def generate_tracks(frame_count, players_per_team=11, referee_count=2, ball_missing_rate=0.1, seed=0):
+    rng = np.random.default_rng(seed)
+    pitch_high = (FRAME_WIDTH + 2 * CAMERA_MARGIN - 80, FRAME_HEIGHT + 2 * CAMERA_MARGIN - 60)
+
+    player_positions = random_walk(frame_count, players_per_team * 2, (80, 200), pitch_high, 6, rng)
+    referee_positions = random_walk(frame_count, referee_count, (80, 200), pitch_high, 5, rng)
+    camera_offsets = get_camera_offsets(frame_count)
+
+    owner = 0
+    pass_target, pass_progress = None, 0
+    ball_positions = np.empty((frame_count, 2))
+    for frame_num in range(frame_count):
+        if pass_target is None and frame_num % 40 == 39:
+            pass_target, pass_progress = int(rng.integers(players_per_team * 2)), 0
+
+        owner_position = player_positions[frame_num, owner] + (12, -6)
+        if pass_target is not None:
+            pass_progress += 1
+            target_position = player_positions[frame_num, pass_target] + (12, -6)
+            ball_positions[frame_num] = owner_position + (target_position - owner_position) * pass_progress / 10
+            if pass_progress == 10:
+                owner, pass_target = pass_target, None
+        else:
+            ball_positions[frame_num] = owner_position
+
+    tracks = {'players': [], 'referees': [], 'ball': []}
+    team_of_player = {player_id: 1 if player_id <= players_per_team else 2
+                      for player_id in range(1, players_per_team * 2 + 1)}
+
+    for frame_num in range(frame_count):
+        offset = camera_offsets[frame_num]
+
+        players = {}
+        for i, position in enumerate(player_positions[frame_num]):
+            bbox = get_bbox(position - offset)
+            if is_visible(bbox):
+                players[i + 1] = {'bbox': bbox}
+
+        referees = {}
+        for i, position in enumerate(referee_positions[frame_num]):
+            bbox = get_bbox(position - offset)
+            if is_visible(bbox):
+                referees[players_per_team * 2 + i + 1] = {'bbox': bbox}
+
+        ball = {}
+        x, y = ball_positions[frame_num] - offset
+        ball_bbox = [x - 8, y - 8, x + 8, y + 8]
+        if (frame_num == 0 or rng.random() >= ball_missing_rate) and is_visible(ball_bbox):
+            ball[1] = {'bbox': ball_bbox}
+
+        tracks['players'].append(players)
+        tracks['referees'].append(referees)
+        tracks['ball'].append(ball)
+
+    return tracks, team_of_player, camera_offsets
+
+
+def draw_person(frame, bbox, shirt_color):
+    x1, y1, x2, y2 = bbox
+    width = x2 - x1
+    height = y2 - y1
+    body_x1 = int(x1 + width * 0.2)
+    body_x2 = int(x2 - width * 0.2)
+    shirt_y2 = int(y1 + height * 0.5)
+
+    cv2.rectangle(frame, (body_x1, int(y1 + height * 0.12)), (body_x2, shirt_y2), shirt_color, cv2.FILLED)
+    cv2.rectangle(frame, (body_x1, shirt_y2), (body_x2, int(y1 + height * 0.75)), SHORTS_COLOR, cv2.FILLED)
+    cv2.circle(frame, (int((x1 + x2) / 2), int(y1 + height * 0.07)), max(2, int(width * 0.18)), (140, 170, 210),
+               cv2.FILLED)
+
+
+def render_frames(tracks, team_of_player, camera_offsets, seed=0):
+    rng = np.random.default_rng(seed)
+    pitch = make_pitch(FRAME_WIDTH + 2 * CAMERA_MARGIN, FRAME_HEIGHT + 2 * CAMERA_MARGIN, rng)
+
+    frames = []
+    for frame_num, (offset_x, offset_y) in enumerate(camera_offsets):
+        frame = pitch[offset_y:offset_y + FRAME_HEIGHT, offset_x:offset_x + FRAME_WIDTH].copy()
+
+        for player_id, player in tracks['players'][frame_num].items():
+            draw_person(frame, player['bbox'], TEAM_SHIRT_COLORS[team_of_player.get(player_id, 1)])
+        for referee in tracks['referees'][frame_num].values():
+            draw_person(frame, referee['bbox'], REFEREE_SHIRT_COLOR)
+        for ball in tracks['ball'][frame_num].values():
+            x1, y1, x2, y2 = ball['bbox']
+            cv2.circle(frame, (int((x1 + x2) / 2), int((y1 + y2) / 2)), 7, (255, 255, 255), cv2.FILLED)
+
+        frames.append(frame)
+
+    return frames
+
+
+def generate_synthetic_match(frame_count, seed=0):
+    tracks, team_of_player, camera_offsets = generate_tracks(frame_count, seed=seed)
+    frames = render_frames(tracks, team_of_player, camera_offsets, seed=seed)
+    return frames, tracks, get_camera_movement(camera_offsets)
+
+
+def load_stub(path, load_columnar):
+    if path.endswith('.pkl'):
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    return load_columnar(path)
+
+
+def load_stub_match(frame_count, track_stub_path='stubs/track_stubs.tracks',
+                    camera_stub_path='stubs/camera_movement_stub.camera'):
+    stub_tracks = load_stub(track_stub_path, load_tracks)
+    stub_camera_movement = load_stub(camera_stub_path, load_camera_movement)
+
+    stub_length = len(stub_tracks['players'])
+    tracks = {
+        object: [
+            {track_id: {'bbox': list(track['bbox'])} for track_id, track in object_tracks[i % stub_length].items()}
+            for i in range(frame_count)
+        ]
+        for object, object_tracks in stub_tracks.items()
+    }
+    camera_movement = [list(stub_camera_movement[i % stub_length]) for i in range(frame_count)]
+
+    camera_offsets = np.clip(
+        CAMERA_MARGIN + np.cumsum(np.array(camera_movement), axis=0).round(), 0, 2 * CAMERA_MARGIN
+    ).astype(int)
+    player_ids = sorted({player_id for frame in tracks['players'] for player_id in frame})
+    team_of_player = {player_id: 1 if i % 2 == 0 else 2 for i, player_id in enumerate(player_ids)}
+    frames = render_frames(tracks, team_of_player, camera_offsets)
+
+    return frames, tracks, camera_movement
+
+
+def write_video(frames, output_path, frame_rate=24):
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    height, width = frames[0].shape[:2]
+    out = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'mp4v'), frame_rate, (width, height))
+    for frame in frames:
+        out.write(frame)
+    out.release()
+    return output_path
@@ -1,4 +1,6 @@
 from utils import measure_distance, measure_xy_distance
+from track_store import load_camera_movement, save_camera_movement
+from metrics import CAMERA_MOTION_FRAMES
 import pickle
 import cv2
 import numpy as np
@@ -9,8 +11,14 @@ sys.path.append('../')
 
 
 class CameraMovementEstimator:
-    def __init__(self, frame):
+    def __init__(self, frame, static_scale=4, gate_static_frames=True):
         self.minimum_distance = 5
+        # displacements measured at reduced scale are coarse and miss the jitter of single features at full
+        # size, so only frames well under a pixel of motion are skipped
+        self.static_distance = self.minimum_distance / 5
+        self.static_scale = static_scale
+        self.gate_static_frames = gate_static_frames
+        self.static_frame_ratio = 0
 
         self.lk_params = dict(
             winSize=(15, 15),
@@ -31,7 +39,27 @@ class CameraMovementEstimator:
             mask=mask_features
         )
 
-    def add_adjust_positions_to_tracks(self, tracks, camera_movement_per_frame):
+    def get_small_frame(self, frame_gray):
+        height, width = frame_gray.shape
+        return cv2.resize(frame_gray, (width // self.static_scale, height // self.static_scale),
+                          interpolation=cv2.INTER_AREA)
+
+    def get_small_frame_shift(self, old_small, new_small, old_features):
+        # follow the features the full-size pass would track, so both measure the same largest displacement
+        old_points = (old_features / self.static_scale).astype(np.float32)
+        new_points, status, _ = cv2.calcOpticalFlowPyrLK(old_small, new_small, old_points, None, **self.lk_params)
+        if not (status.ravel() == 1).all():
+            return None
+
+        distances = np.linalg.norm((new_points - old_points).reshape(-1, 2), axis=1)
+        return float(distances.max()) * self.static_scale
+
+    def is_static(self, old_small, new_small, old_features):
+        shift = self.get_small_frame_shift(old_small, new_small, old_features)
+        return shift is not None and shift < self.static_distance
+
+    @staticmethod
+    def add_adjust_positions_to_tracks(tracks, camera_movement_per_frame):
         for object, object_tracks in tracks.items():
             for frame_num, track in enumerate(object_tracks):
                 for track_id, track_info in track.items():
@@ -40,18 +68,36 @@ class CameraMovementEstimator:
                     position_adjusted = (position[0] - camera_movement[0], position[1] - camera_movement[1])
                     tracks[object][frame_num][track_id]['position_adjusted'] = position_adjusted
 
-    def get_camera_movement(self, frames, read_from_stub=False, stub_path=None):
+    def get_camera_movement(self, frames, read_from_stub=False, stub_path=None, progress_callback=None):
         if read_from_stub and stub_path is not None and os.path.exists(stub_path):
-            with open(stub_path, 'rb') as f:
-                return pickle.load(f)
+            if stub_path.endswith('.pkl'):
+                with open(stub_path, 'rb') as f:
+                    return pickle.load(f)
+            return load_camera_movement(stub_path)
 
         camera_movement = [[0, 0]] * len(frames)
 
         old_gray = cv2.cvtColor(frames[0], cv2.COLOR_BGR2GRAY)
+        old_small = self.get_small_frame(old_gray)
         old_features = cv2.goodFeaturesToTrack(old_gray, **self.features)
+        static_frames = 0
 
         for frame_num in range(1, len(frames)):
             frame_gray = cv2.cvtColor(frames[frame_num], cv2.COLOR_BGR2GRAY)
+            frame_small = self.get_small_frame(frame_gray)
+
+            static = old_features is not None and self.gate_static_frames and \
+                self.is_static(old_small, frame_small, old_features)
+            if old_features is None or static:
+                if old_features is None:
+                    old_features = cv2.goodFeaturesToTrack(frame_gray, **self.features)
+                else:
+                    static_frames += 1
+                old_gray, old_small = frame_gray, frame_small
+                if progress_callback is not None:
+                    progress_callback(frame_num + 1, len(frames))
+                continue
+
             new_features, _, _ = cv2.calcOpticalFlowPyrLK(old_gray, frame_gray, old_features, None, **self.lk_params)
 
             max_distance = 0
@@ -70,11 +116,21 @@ class CameraMovementEstimator:
                 camera_movement[frame_num] = [camera_movement_x, camera_movement_y]
                 old_features = cv2.goodFeaturesToTrack(frame_gray, **self.features)
 
-            old_gray = frame_gray.copy()
+            old_gray, old_small = frame_gray, frame_small
+
+            if progress_callback is not None:
+                progress_callback(frame_num + 1, len(frames))
+
+        self.static_frame_ratio = static_frames / max(len(frames) - 1, 1)
+        CAMERA_MOTION_FRAMES.labels('static').inc(static_frames)
+        CAMERA_MOTION_FRAMES.labels('optical_flow').inc(len(frames) - 1 - static_frames)
 
         if stub_path is not None:
-            with open(stub_path, 'wb') as f:
-                pickle.dump(camera_movement, f)
+            if stub_path.endswith('.pkl'):
+                with open(stub_path, 'wb') as f:
+                    pickle.dump(camera_movement, f)
+            else:
+                save_camera_movement(camera_movement, stub_path)
 
         return camera_movement
 
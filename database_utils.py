@@ -1,13 +1,18 @@
 import os
 import uuid
+from contextlib import contextmanager
 from dotenv import load_dotenv
 import psycopg2
+from psycopg2.pool import ThreadedConnectionPool
+from psycopg2.extras import execute_values
 
 load_dotenv()
 
+connection_pool = None
 
-def get_connection():
-    return psycopg2.connect(
+
+def get_connection_params():
+    return dict(
         dbname=os.getenv('dbname'),
         user=os.getenv('user'),
         password=os.getenv('password'),
@@ -16,172 +21,671 @@ def get_connection():
     )
 
 
-def insert_match(video_bytes, video_name):
-    conn = get_connection()
-    cur = conn.cursor()
+def get_connection():
+    return psycopg2.connect(**get_connection_params())
+
+
+def get_connection_pool():
+    global connection_pool
+    if connection_pool is None or connection_pool.closed:
+        connection_pool = ThreadedConnectionPool(
+            int(os.getenv('pool_min_size', 1)),
+            int(os.getenv('pool_max_size', 5)),
+            **get_connection_params()
+        )
+    return connection_pool
+
+
+def close_connection_pool():
+    global connection_pool
+    if connection_pool is not None and not connection_pool.closed:
+        connection_pool.closeall()
+    connection_pool = None
+
+
+@contextmanager
+def pooled_connection():
+    pool = get_connection_pool()
+    conn = pool.getconn()
     try:
-        match_id = str(uuid.uuid4())
-        insert_query = """
-            INSERT INTO match_info (match_id, match_video_name, processed_match_video)
-            VALUES (%s, %s, %s);
-        """
-        cur.execute(insert_query, (match_id, video_name, psycopg2.Binary(video_bytes)))
-        conn.commit()
-        return match_id
-    except Exception as e:
-        conn.rollback()
-        raise e
+        yield conn
     finally:
-        cur.close()
-        conn.close()
+        pool.putconn(conn, close=bool(conn.closed))
 
 
-def insert_team_and_stats(match_id, team_color, ball_possession):
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
-        team_id = str(uuid.uuid4())
-        team_query = """
-            INSERT INTO team (team_id, match_id, team_color)
-            VALUES (%s, %s, %s);
+def ensure_schema():
+    schema_queries = [
+        "ALTER TABLE match_info ADD COLUMN IF NOT EXISTS created_at TIMESTAMPTZ NOT NULL DEFAULT now();",
+        "ALTER TABLE match_info ADD COLUMN IF NOT EXISTS processed_video_ref TEXT;",
+        "ALTER TABLE match_info ALTER COLUMN processed_match_video DROP NOT NULL;",
+        "ALTER TABLE team ADD COLUMN IF NOT EXISTS team_number SMALLINT;",
+        "CREATE INDEX IF NOT EXISTS team_match_id_idx ON team (match_id);",
+        "CREATE INDEX IF NOT EXISTS teamstats_match_id_idx ON teamstats (match_id);",
+        "CREATE INDEX IF NOT EXISTS teamstats_team_id_idx ON teamstats (team_id);",
+        "CREATE INDEX IF NOT EXISTS player_match_id_idx ON player (match_id);",
+        "CREATE INDEX IF NOT EXISTS playerstats_match_id_idx ON playerstats (match_id);",
+        "CREATE INDEX IF NOT EXISTS playerstats_player_id_idx ON playerstats (player_id);",
+        "CREATE INDEX IF NOT EXISTS playerstats_distance_idx ON playerstats (distance DESC);",
+        "CREATE INDEX IF NOT EXISTS match_info_created_at_match_id_idx ON match_info (created_at, match_id);",
         """
-        cur.execute(team_query, (team_id, match_id, team_color))
-
-        teamstats_query = """
-            INSERT INTO teamstats (team_id, match_id, ball_possession)
-            VALUES (%s, %s, %s);
+        CREATE TABLE IF NOT EXISTS match_analytics (
+            match_id UUID NOT NULL REFERENCES match_info (match_id) ON DELETE CASCADE,
+            kind TEXT NOT NULL,
+            data BYTEA NOT NULL,
+            PRIMARY KEY (match_id, kind)
+        );
+        """,
+        """
+        CREATE MATERIALIZED VIEW IF NOT EXISTS match_summary AS
+        SELECT m.match_id, m.match_video_name, m.created_at, t.team_id, t.team_color, ts.ball_possession,
+               row_number() OVER (PARTITION BY m.match_id ORDER BY t.team_number NULLS LAST, t.team_id) AS team_rank,
+               count(ps.player_id) AS player_count,
+               coalesce(sum(ps.distance), 0) AS total_distance,
+               coalesce(sum(ps.avg_speed), 0) AS speed_sum,
+               max(ps.avg_speed) AS max_avg_speed
+        FROM match_info m
+        JOIN team t ON t.match_id = m.match_id
+        LEFT JOIN teamstats ts ON ts.team_id = t.team_id AND ts.match_id = m.match_id
+        LEFT JOIN playerstats ps ON ps.team_id = t.team_id AND ps.match_id = m.match_id
+        GROUP BY m.match_id, m.match_video_name, m.created_at, t.team_id, t.team_number, t.team_color,
+                 ts.ball_possession;
+        """,
+        "CREATE UNIQUE INDEX IF NOT EXISTS match_summary_team_id_idx ON match_summary (team_id);",
+        "CREATE INDEX IF NOT EXISTS match_summary_created_at_idx ON match_summary (created_at);",
         """
-        cur.execute(teamstats_query, (team_id, match_id, ball_possession))
+        CREATE TABLE IF NOT EXISTS match_summary_state (
+            id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+            stale BOOLEAN NOT NULL DEFAULT FALSE
+        );
+        """,
+        "INSERT INTO match_summary_state (id, stale) VALUES (TRUE, TRUE) ON CONFLICT (id) DO NOTHING;",
+    ]
+
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        try:
+            for query in schema_queries:
+                cur.execute(query)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            cur.close()
 
-        conn.commit()
-        return team_id
-    except Exception as e:
-        conn.rollback()
-        raise e
-    finally:
-        cur.close()
-        conn.close()
+
+def insert_match(video_bytes, video_name):
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        try:
+            match_id = str(uuid.uuid4())
+            insert_query = """
+                INSERT INTO match_info (match_id, match_video_name, processed_match_video)
+                VALUES (%s, %s, %s);
+            """
+            cur.execute(insert_query, (match_id, video_name, psycopg2.Binary(video_bytes)))
+            conn.commit()
+            return match_id
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            cur.close()
+
+
+def insert_team_and_stats(match_id, team_color, ball_possession):
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        try:
+            team_id = str(uuid.uuid4())
+            team_query = """
+                INSERT INTO team (team_id, match_id, team_color)
+                VALUES (%s, %s, %s);
+            """
+            cur.execute(team_query, (team_id, match_id, team_color))
+
+            teamstats_query = """
+                INSERT INTO teamstats (team_id, match_id, ball_possession)
+                VALUES (%s, %s, %s);
+            """
+            cur.execute(teamstats_query, (team_id, match_id, ball_possession))
+
+            conn.commit()
+            return team_id
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            cur.close()
 
 
 def insert_player_and_stats(team_id, match_id, player_number, distance, avg_speed):
-    conn = get_connection()
-    cur = conn.cursor()
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        try:
+            player_id = str(uuid.uuid4())
+            player_query = """
+                INSERT INTO player (player_id, team_id, match_id, player_number)
+                VALUES (%s, %s, %s, %s);
+            """
+            cur.execute(player_query, (player_id, team_id, match_id, player_number))
+
+            playerstats_query = """
+                INSERT INTO playerstats (player_id, team_id, match_id, distance, avg_speed)
+                VALUES (%s, %s, %s, %s, %s);
+            """
+            cur.execute(playerstats_query, (player_id, team_id, match_id, distance, avg_speed))
+
+            conn.commit()
+            return player_id
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            cur.close()
+
+
+def get_team_colors_from_stats(stats):
+    team_colors = {1: (0, 0, 0), 2: (0, 0, 0)}
+
+    for player_stats in stats['players'].values():
+        team = player_stats['team']
+        team_color = tuple(int(round(c)) for c in player_stats['team_color'])
+        if team in team_colors and team_colors[team] == (0, 0, 0):
+            team_colors[team] = team_color
+
+    return team_colors
+
+
+def refresh_match_summary():
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY match_summary;")
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            cur.close()
+
+
+def mark_match_summary_stale(cur):
+    cur.execute("UPDATE match_summary_state SET stale = TRUE;")
+
+
+def refresh_stale_match_summary():
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        try:
+            # clearing the flag first waits for saves that already marked it, so their rows are in the refresh,
+            # and any save committed afterwards marks it again for the next read
+            cur.execute("UPDATE match_summary_state SET stale = FALSE WHERE stale RETURNING id;")
+            stale = cur.fetchone() is not None
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print(f'Помилка перевірки зведення матчів: {e}')
+            return
+        finally:
+            cur.close()
+
+    if not stale:
+        return
+
     try:
+        refresh_match_summary()
+    except Exception as e:
+        print(f'Помилка оновлення зведення матчів: {e}')
+        with pooled_connection() as conn:
+            cur = conn.cursor()
+            try:
+                mark_match_summary_stale(cur)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+            finally:
+                cur.close()
+
+
+def save_match_results(video_ref, video_name, stats, refresh_summary=True, analytics=None):
+    match_id = str(uuid.uuid4())
+    team_colors = get_team_colors_from_stats(stats)
+    team_ids = {1: str(uuid.uuid4()), 2: str(uuid.uuid4())}
+
+    team_rows = [(team_ids[team], match_id, team, ','.join(map(str, team_colors[team]))) for team in (1, 2)]
+    teamstats_rows = [
+        (team_ids[team], match_id, int(stats['team_possession'][f'team{team}'])) for team in (1, 2)
+    ]
+
+    player_rows = []
+    playerstats_rows = []
+    for player_number, player_stats in stats['players'].items():
         player_id = str(uuid.uuid4())
-        player_query = """
-            INSERT INTO player (player_id, team_id, match_id, player_number)
-            VALUES (%s, %s, %s, %s);
-        """
-        cur.execute(player_query, (player_id, team_id, match_id, player_number))
+        team_id = team_ids[1] if player_stats['team'] == 1 else team_ids[2]
+        player_rows.append((player_id, team_id, match_id, int(player_number)))
+        playerstats_rows.append(
+            (player_id, team_id, match_id, float(player_stats['total_distance']), float(player_stats['avg_speed']))
+        )
 
-        playerstats_query = """
-            INSERT INTO playerstats (player_id, team_id, match_id, distance, avg_speed)
-            VALUES (%s, %s, %s, %s, %s);
-        """
-        cur.execute(playerstats_query, (player_id, team_id, match_id, distance, avg_speed))
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(
+                """
+                INSERT INTO match_info (match_id, match_video_name, processed_video_ref)
+                VALUES (%s, %s, %s);
+                """,
+                (match_id, video_name, video_ref)
+            )
+            execute_values(
+                cur, "INSERT INTO team (team_id, match_id, team_number, team_color) VALUES %s;", team_rows
+            )
+            execute_values(
+                cur, "INSERT INTO teamstats (team_id, match_id, ball_possession) VALUES %s;", teamstats_rows
+            )
+            if player_rows:
+                execute_values(
+                    cur, "INSERT INTO player (player_id, team_id, match_id, player_number) VALUES %s;", player_rows
+                )
+                execute_values(
+                    cur,
+                    "INSERT INTO playerstats (player_id, team_id, match_id, distance, avg_speed) VALUES %s;",
+                    playerstats_rows
+                )
+            if analytics:
+                execute_values(
+                    cur, "INSERT INTO match_analytics (match_id, kind, data) VALUES %s;",
+                    [(match_id, kind, psycopg2.Binary(data)) for kind, data in analytics.items()]
+                )
+            if refresh_summary:
+                mark_match_summary_stale(cur)
 
-        conn.commit()
-        return player_id
-    except Exception as e:
-        conn.rollback()
-        raise e
-    finally:
-        cur.close()
-        conn.close()
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            cur.close()
+
+    return match_id
+
+
+def delete_match(match_id, refresh_summary=True):
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        try:
+            for table in ('match_analytics', 'playerstats', 'player', 'teamstats', 'team', 'match_info'):
+                cur.execute(f"DELETE FROM {table} WHERE match_id = %s;", (match_id,))
+            if refresh_summary:
+                mark_match_summary_stale(cur)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            cur.close()
+
+
+def stream_rows(query, params=None, fetch_size=10000):
+    with pooled_connection() as conn:
+        cur = conn.cursor(name=f'stream_{uuid.uuid4().hex}')
+        cur.itersize = fetch_size
+        try:
+            cur.execute(query, params)
+            while True:
+                rows = cur.fetchmany(fetch_size)
+                if not rows:
+                    break
+                yield [column.name for column in cur.description], rows
+        finally:
+            cur.close()
+            conn.rollback()
 
 
 def fetch_all_matches():
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute("SELECT match_id, match_video_name FROM match_info;")
-        rows = cur.fetchall()
-        return [{'match_id': row[0], 'match_video_name': row[1]} for row in rows]
-    finally:
-        cur.close()
-        conn.close()
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute("SELECT match_id, match_video_name FROM match_info;")
+            rows = cur.fetchall()
+            return [{'match_id': row[0], 'match_video_name': row[1]} for row in rows]
+        finally:
+            cur.close()
+
+
+def fetch_matches_page(after=None, limit=50):
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        try:
+            if after is None:
+                cur.execute(
+                    """
+                    SELECT match_id, match_video_name, created_at FROM match_info
+                    ORDER BY created_at DESC, match_id DESC
+                    LIMIT %s;
+                    """,
+                    (limit,)
+                )
+            else:
+                cur.execute(
+                    """
+                    SELECT match_id, match_video_name, created_at FROM match_info
+                    WHERE (created_at, match_id) < (%s, %s)
+                    ORDER BY created_at DESC, match_id DESC
+                    LIMIT %s;
+                    """,
+                    (after[0], after[1], limit)
+                )
+            rows = cur.fetchall()
+        finally:
+            cur.close()
+
+    matches = [{'match_id': row[0], 'match_video_name': row[1], 'created_at': row[2]} for row in rows]
+    next_cursor = (rows[-1][2], rows[-1][0]) if len(rows) == limit else None
+    return matches, next_cursor
 
 
 def fetch_match(match_id):
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute("SELECT processed_match_video FROM match_info WHERE match_id = %s", (match_id,))
-        row = cur.fetchone()
-        return row
-    finally:
-        cur.close()
-        conn.close()
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute("SELECT processed_match_video FROM match_info WHERE match_id = %s", (match_id,))
+            row = cur.fetchone()
+            return row
+        finally:
+            cur.close()
+
+
+def fetch_match_video(match_id):
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(
+                """
+                SELECT processed_video_ref,
+                       CASE WHEN processed_video_ref IS NULL THEN processed_match_video END
+                FROM match_info
+                WHERE match_id = %s;
+                """,
+                (match_id,)
+            )
+            row = cur.fetchone()
+        finally:
+            cur.close()
+
+    if row is None:
+        return None
+    video_ref, video_bytes = row
+    return video_ref, bytes(video_bytes) if video_bytes is not None else None
+
+
+def migrate_legacy_videos(storage):
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(
+                "SELECT match_id FROM match_info WHERE processed_video_ref IS NULL AND processed_match_video IS NOT NULL;"
+            )
+            match_ids = [row[0] for row in cur.fetchall()]
+            conn.rollback()
+
+            for match_id in match_ids:
+                cur.execute("SELECT processed_match_video FROM match_info WHERE match_id = %s;", (match_id,))
+                video_ref = storage.put_bytes(bytes(cur.fetchone()[0]))
+                cur.execute(
+                    """
+                    UPDATE match_info SET processed_video_ref = %s, processed_match_video = NULL
+                    WHERE match_id = %s;
+                    """,
+                    (video_ref, match_id)
+                )
+                conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            cur.close()
+
+    return len(match_ids)
 
 
 def fetch_all_teams():
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute("SELECT team_id, match_id, team_color FROM team;")
-        rows = cur.fetchall()
-        return [{'team_id': row[0], 'match_id': row[1], 'team_color': row[2]} for row in rows]
-    finally:
-        cur.close()
-        conn.close()
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute("SELECT team_id, match_id, team_color FROM team;")
+            rows = cur.fetchall()
+            return [{'team_id': row[0], 'match_id': row[1], 'team_color': row[2]} for row in rows]
+        finally:
+            cur.close()
 
 
 def fetch_all_teamstats():
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute("SELECT team_id, match_id, ball_possession FROM teamstats;")
-        rows = cur.fetchall()
-        return [{'team_id': row[0], 'match_id': row[1], 'ball_possession': row[2]} for row in rows]
-    finally:
-        cur.close()
-        conn.close()
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute("SELECT team_id, match_id, ball_possession FROM teamstats;")
+            rows = cur.fetchall()
+            return [{'team_id': row[0], 'match_id': row[1], 'ball_possession': row[2]} for row in rows]
+        finally:
+            cur.close()
 
 
 def fetch_all_players():
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute("SELECT player_id, team_id, match_id, player_number FROM player;")
-        rows = cur.fetchall()
-        return [{'player_id': row[0], 'team_id': row[1], 'match_id': row[2], 'player_number': row[3]} for row in rows]
-    finally:
-        cur.close()
-        conn.close()
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute("SELECT player_id, team_id, match_id, player_number FROM player;")
+            rows = cur.fetchall()
+            return [
+                {'player_id': row[0], 'team_id': row[1], 'match_id': row[2], 'player_number': row[3]} for row in rows
+            ]
+        finally:
+            cur.close()
 
 
 def fetch_all_playerstats():
-    conn = get_connection()
-    cur = conn.cursor()
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute("SELECT player_id, team_id, match_id, distance, avg_speed FROM playerstats;")
+            rows = cur.fetchall()
+            return [
+                {
+                    'player_id': row[0], 'team_id': row[1], 'match_id': row[2], 'distance': row[3], 'avg_speed': row[4]
+                } for row in rows
+            ]
+        finally:
+            cur.close()
+
+
+def parse_team_color(color_str):
     try:
-        cur.execute("SELECT player_id, team_id, match_id, distance, avg_speed FROM playerstats;")
-        rows = cur.fetchall()
-        return [
-            {
-                'player_id': row[0], 'team_id': row[1], 'match_id': row[2], 'distance': row[3], 'avg_speed': row[4]
-            } for row in rows
-        ]
-    finally:
-        cur.close()
-        conn.close()
+        return tuple(int(c) for c in color_str.strip("()").split(','))
+    except (AttributeError, ValueError):
+        return 0, 0, 0
 
 
 def fetch_team_colors(match_id):
-    conn = get_connection()
-    cur = conn.cursor()
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute("SELECT team_id, team_color FROM team WHERE match_id = %s", (match_id,))
+            results = cur.fetchall()
+        finally:
+            cur.close()
 
-    cur.execute("SELECT team_id, team_color FROM team WHERE match_id = %s", (match_id,))
-    results = cur.fetchall()
+    return {team_id: parse_team_color(color_str) for team_id, color_str in results}
 
-    team_colors = {}
-    for row in results:
-        team_id, color_str = row
+
+def fetch_match_stats(match_id):
+    with pooled_connection() as conn:
+        cur = conn.cursor()
         try:
-            rgb = tuple(int(c) for c in color_str.strip("()").split(','))
-            team_colors[team_id] = rgb
-        except ValueError:
-            team_colors[team_id] = (0, 0, 0)
+            cur.execute(
+                """
+                SELECT t.team_id, t.team_color, ts.ball_possession, p.player_number, ps.distance, ps.avg_speed
+                FROM team t
+                LEFT JOIN teamstats ts ON ts.team_id = t.team_id AND ts.match_id = t.match_id
+                LEFT JOIN player p ON p.team_id = t.team_id AND p.match_id = t.match_id
+                LEFT JOIN playerstats ps ON ps.player_id = p.player_id AND ps.match_id = t.match_id
+                WHERE t.match_id = %s
+                ORDER BY t.team_number NULLS LAST, t.team_id, p.player_number;
+                """,
+                (match_id,)
+            )
+            rows = cur.fetchall()
+        finally:
+            cur.close()
 
-    cur.close()
-    conn.close()
-    return team_colors
+    stats = {
+        'team_possession': {},
+        'team_colors': {},
+        'players': {}
+    }
+
+    team_numbers = {}
+    for team_id, team_color, ball_possession, player_number, distance, avg_speed in rows:
+        if team_id not in team_numbers:
+            team = len(team_numbers) + 1
+            team_numbers[team_id] = team
+            stats['team_possession'][f'team{team}'] = ball_possession if ball_possession is not None else 0
+            stats['team_colors'][team] = parse_team_color(team_color)
+
+        if player_number is None or distance is None:
+            continue
+
+        team = team_numbers[team_id]
+        stats['players'][player_number] = {
+            'avg_speed': avg_speed,
+            'total_distance': distance,
+            'team': team,
+            'team_color': stats['team_colors'][team]
+        }
+
+    return stats
+
+
+def save_match_analytics(match_id, kind, data):
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(
+                """
+                INSERT INTO match_analytics (match_id, kind, data) VALUES (%s, %s, %s)
+                ON CONFLICT (match_id, kind) DO UPDATE SET data = EXCLUDED.data;
+                """,
+                (match_id, kind, psycopg2.Binary(data))
+            )
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            cur.close()
+
+
+def fetch_match_analytics(match_id, kinds=None):
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        try:
+            if kinds is None:
+                cur.execute("SELECT kind, data FROM match_analytics WHERE match_id = %s;", (match_id,))
+            else:
+                cur.execute(
+                    "SELECT kind, data FROM match_analytics WHERE match_id = %s AND kind = ANY(%s);",
+                    (match_id, list(kinds))
+                )
+            return {kind: bytes(data) for kind, data in cur.fetchall()}
+        finally:
+            cur.close()
+
+
+def fetch_distance_leaderboard(limit=10):
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(
+                """
+                SELECT ps.match_id, m.match_video_name, p.player_number, t.team_color, ps.distance, ps.avg_speed
+                FROM playerstats ps
+                JOIN player p ON p.player_id = ps.player_id
+                JOIN team t ON t.team_id = ps.team_id
+                JOIN match_info m ON m.match_id = ps.match_id
+                ORDER BY ps.distance DESC
+                LIMIT %s;
+                """,
+                (limit,)
+            )
+            rows = cur.fetchall()
+        finally:
+            cur.close()
+
+    return [
+        {
+            'match_id': row[0], 'match_video_name': row[1], 'player_number': row[2],
+            'team_color': parse_team_color(row[3]), 'distance': row[4], 'avg_speed': row[5]
+        } for row in rows
+    ]
+
+
+def fetch_team_color_speed_averages():
+    refresh_stale_match_summary()
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(
+                """
+                SELECT team_color, count(DISTINCT match_id), sum(player_count)::BIGINT,
+                       sum(speed_sum) / nullif(sum(player_count), 0), max(max_avg_speed),
+                       sum(total_distance) / nullif(sum(player_count), 0)
+                FROM match_summary
+                GROUP BY team_color
+                ORDER BY 4 DESC NULLS LAST;
+                """
+            )
+            rows = cur.fetchall()
+        finally:
+            cur.close()
+
+    return [
+        {
+            'team_color': parse_team_color(row[0]), 'matches': row[1], 'players': row[2],
+            'avg_speed': row[3], 'max_avg_speed': row[4], 'avg_distance': row[5]
+        } for row in rows
+    ]
+
+
+def fetch_possession_trend(limit=100, rolling_window=5):
+    refresh_stale_match_summary()
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(
+                """
+                SELECT match_id, match_video_name, created_at, team1, team2,
+                       avg(team1) OVER (ORDER BY created_at, match_id ROWS BETWEEN %s PRECEDING AND CURRENT ROW)
+                FROM (
+                    SELECT match_id, match_video_name, created_at,
+                           max(ball_possession) FILTER (WHERE team_rank = 1) AS team1,
+                           max(ball_possession) FILTER (WHERE team_rank = 2) AS team2
+                    FROM match_summary
+                    GROUP BY match_id, match_video_name, created_at
+                    ORDER BY created_at DESC, match_id DESC
+                    LIMIT %s
+                ) recent
+                ORDER BY created_at, match_id;
+                """,
+                (max(rolling_window - 1, 0), limit)
+            )
+            rows = cur.fetchall()
+        finally:
+            cur.close()
+
+    return [
+        {
+            'match_id': row[0], 'match_video_name': row[1], 'created_at': row[2],
+            'team1': row[3], 'team2': row[4], 'team1_rolling': float(row[5]) if row[5] is not None else None
+        } for row in rows
+    ]
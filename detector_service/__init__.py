@@ -0,0 +1 @@
+from .detector_service import DetectorService, DetectorClient, run_detector_service
@@ -0,0 +1,244 @@
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import traceback
+from multiprocessing.connection import Client, Listener
+
+
+def close_frame_buffers(frame_buffers):
+    for frame_buffer in frame_buffers.values():
+        try:
+            frame_buffer.close()
+        except BufferError:
+            # the model can keep a view of its last input batch, the mapping then goes away with the process
+            pass
+
+
+def serve_connection(conn, tracker, info, lock):
+    from trackers.batch_sizer import get_memory_usage
+    from frame_buffer import FrameRingBuffer
+
+    frame_buffers = {}
+    frames = None
+    with conn:
+        while True:
+            try:
+                request = conn.recv()
+            except EOFError:
+                frames = None
+                close_frame_buffers(frame_buffers)
+                return
+
+            try:
+                if request[0] == 'info':
+                    with lock:
+                        conn.send(('ok', dict(info)))
+                elif request[0] in ('detect', 'detect_shared'):
+                    if request[0] == 'detect_shared':
+                        spec, slots = request[1], request[2]
+                        if spec['name'] not in frame_buffers:
+                            # the client replaces its buffer when frames outgrow it, so drop the old one
+                            frames = None
+                            close_frame_buffers(frame_buffers)
+                            frame_buffers = {spec['name']: FrameRingBuffer.attach(spec)}
+                        frames = [frame_buffers[spec['name']].get(slot) for slot in slots]
+                    else:
+                        frames = request[1]
+
+                    with lock:
+                        # the client sizes its requests, so each one is a single inference batch
+                        memory_before = get_memory_usage()
+                        detections = tracker.detect_frames(frames, batch_size=len(frames))
+                        memory_growth = get_memory_usage() - memory_before
+                        info['batches'] += 1
+                        info['frames'] += len(frames)
+                    frames = None
+                    conn.send(('ok', (detections, memory_growth)))
+                else:
+                    conn.send(('error', f'Unknown request: {request[0]}'))
+            except Exception as e:
+                traceback.print_exc()
+                conn.send(('error', str(e)))
+
+
+def run_detector_service(model_path, authkey, events):
+    try:
+        import numpy as np
+        from trackers import Tracker
+        from metrics import DETECTOR_COLD_START_SECONDS
+
+        start = time.perf_counter()
+        tracker = Tracker(model_path)
+        load_seconds = time.perf_counter() - start
+
+        # the first predict fuses the model layers and allocates the inference buffers
+        start = time.perf_counter()
+        tracker.detect_frames([np.zeros((640, 640, 3), dtype=np.uint8)], batch_size=1)
+        warmup_seconds = time.perf_counter() - start
+        DETECTOR_COLD_START_SECONDS.observe(load_seconds + warmup_seconds)
+
+        listener = Listener(('127.0.0.1', 0), authkey=authkey)
+    except Exception as e:
+        traceback.print_exc()
+        events.put(('error', str(e)))
+        return
+
+    info = {
+        'model_path': model_path,
+        'class_names': tracker.get_class_names(),
+        'pid': os.getpid(),
+        'load_seconds': load_seconds,
+        'warmup_seconds': warmup_seconds,
+        'clients': 0,
+        'batches': 0,
+        'frames': 0,
+    }
+    lock = threading.Lock()
+    events.put(('ready', listener.address, load_seconds, warmup_seconds))
+
+    while True:
+        conn = listener.accept()
+        with lock:
+            info['clients'] += 1
+        threading.Thread(target=serve_connection, args=(conn, tracker, info, lock), daemon=True).start()
+
+
+class DetectorService:
+    def __init__(self, model_path='models/best.pt', start_timeout=300):
+        self.model_path = model_path
+        self.start_timeout = start_timeout
+        self.context = multiprocessing.get_context('spawn')
+        self.authkey = os.urandom(16)
+        self.process = None
+        self.address = None
+        self.lock = threading.Lock()
+
+    def get_address(self):
+        with self.lock:
+            if self.process is not None and self.process.is_alive():
+                return self.address
+
+            self.address = None
+            events = self.context.Queue()
+            self.process = self.context.Process(
+                target=run_detector_service, args=(self.model_path, self.authkey, events), daemon=True
+            )
+            self.process.start()
+
+            try:
+                event = events.get(timeout=self.start_timeout)
+            except queue.Empty:
+                event = ('error', f'Detector service did not start within {self.start_timeout} s')
+            finally:
+                events.close()
+
+            if event[0] == 'ready':
+                _, self.address, load_seconds, warmup_seconds = event
+                print(f'Детектор завантажено за {load_seconds:.2f} с, прогрів {warmup_seconds:.2f} с')
+            else:
+                print(f'Помилка запуску сервісу детектора: {event[1]}')
+                self.stop_process()
+
+            return self.address
+
+    def stop_process(self):
+        if self.process is not None and self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.process = None
+
+    def stop(self):
+        with self.lock:
+            self.stop_process()
+            self.address = None
+
+
+class DetectorClient:
+    def __init__(self, address, authkey, batch_size=None):
+        self.conn = Client(address, authkey=authkey)
+        self.batch_size = batch_size
+        self.batch_sizer = None
+        self.frame_buffer = None
+        self.shared_memory_failed = False
+        self.info = self.request('info')
+
+    def request(self, *request):
+        self.conn.send(request)
+        status, result = self.conn.recv()
+        if status != 'ok':
+            raise RuntimeError(f'Detector service error: {result}')
+        return result
+
+    def get_class_names(self):
+        return self.info['class_names']
+
+    def get_info(self):
+        return self.request('info')
+
+    def get_frame_buffer(self, frames):
+        import numpy as np
+        from frame_buffer import FrameRingBuffer
+
+        if self.shared_memory_failed:
+            return None
+        if not all(frame.dtype == np.uint8 and frame.shape == frames[0].shape for frame in frames):
+            return None
+
+        frame_buffer = self.frame_buffer
+        if frame_buffer is None or not frame_buffer.accepts(frames[0]) or frame_buffer.slot_count < len(frames):
+            slot_count = len(frames)
+            if frame_buffer is not None:
+                if frame_buffer.accepts(frames[0]):
+                    slot_count = max(slot_count, frame_buffer.slot_count)
+                frame_buffer.close()
+                self.frame_buffer = None
+            try:
+                self.frame_buffer = FrameRingBuffer(slot_count, frames[0].shape)
+            except OSError as e:
+                # /dev/shm is only 64 MB in a default container, the socket path still works there
+                print(f'Помилка виділення спільної пам\'яті, кадри передаються через сокет: {e}')
+                self.shared_memory_failed = True
+                return None
+        return self.frame_buffer
+
+    def detect_batch(self, frames):
+        detections, _ = self.detect_batch_with_memory(frames)
+        return detections
+
+    def detect_batch_with_memory(self, frames):
+        frame_buffer = self.get_frame_buffer(frames) if frames else None
+        if frame_buffer is None:
+            return self.request('detect', frames)
+
+        # frames go through shared memory and only slot indices cross the socket
+        slots = [frame_buffer.put(frame) for frame in frames]
+        try:
+            return self.request('detect_shared', frame_buffer.get_spec(), slots)
+        finally:
+            for slot in slots:
+                frame_buffer.release(slot)
+
+    def detect_frames(self, frames, progress_callback=None, batch_size=None):
+        from trackers.batch_sizer import BatchSizer, detect_in_batches
+
+        batch_size = batch_size or self.batch_size
+        if batch_size is not None:
+            detections = []
+            for i in range(0, len(frames), batch_size):
+                detections += self.detect_batch(frames[i:i + batch_size])
+                if progress_callback is not None:
+                    progress_callback(min(i + batch_size, len(frames)), len(frames))
+            return detections
+
+        if self.batch_sizer is None:
+            self.batch_sizer = BatchSizer()
+        # the service holds the model, so its memory growth per batch is what the budget has to cover
+        return detect_in_batches(frames, self.detect_batch_with_memory, self.batch_sizer, progress_callback)
+
+    def close(self):
+        self.conn.close()
+        if self.frame_buffer is not None:
+            self.frame_buffer.close()
+            self.frame_buffer = None
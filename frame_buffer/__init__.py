@@ -0,0 +1 @@
+from .frame_buffer import FrameRingBuffer
@@ -0,0 +1,106 @@
+import errno
+import multiprocessing
+import os
+import shutil
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+SHARED_MEMORY_DIR = '/dev/shm'
+
+
+def check_shared_memory_space(size):
+    # tmpfs hands out pages on first write, so an oversized buffer would only fail later with SIGBUS
+    if os.path.isdir(SHARED_MEMORY_DIR) and shutil.disk_usage(SHARED_MEMORY_DIR).free < size:
+        raise OSError(errno.ENOSPC, f'Not enough shared memory for a frame buffer of {size} bytes')
+
+
+class FrameRingBuffer:
+    def __init__(self, slot_count, frame_shape, dtype='uint8', name=None, lock=None):
+        self.slot_count = slot_count
+        self.frame_shape = tuple(frame_shape)
+        self.dtype = np.dtype(dtype)
+        self.frame_bytes = int(np.prod(self.frame_shape)) * self.dtype.itemsize
+        self.owner = name is None
+
+        data_bytes = self.frame_bytes * slot_count
+        if self.owner:
+            size = data_bytes + 4 * (slot_count + 1)
+            check_shared_memory_space(size)
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+            self.lock = lock or multiprocessing.Lock()
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.lock = lock
+
+        self.frames = np.ndarray((slot_count, *self.frame_shape), dtype=self.dtype, buffer=self.shm.buf)
+        # reference count per slot followed by the write cursor
+        self.header = np.ndarray((slot_count + 1,), dtype=np.int32, buffer=self.shm.buf, offset=data_bytes)
+        if self.owner:
+            self.header[:] = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def get_spec(self):
+        return {
+            'name': self.name,
+            'slot_count': self.slot_count,
+            'frame_shape': self.frame_shape,
+            'dtype': self.dtype.str,
+        }
+
+    @classmethod
+    def attach(cls, spec, lock=None):
+        return cls(spec['slot_count'], spec['frame_shape'], spec['dtype'], name=spec['name'], lock=lock)
+
+    def get_lock(self):
+        if self.lock is None:
+            raise RuntimeError(f'Frame buffer {self.name} is attached read-only')
+        return self.lock
+
+    def accepts(self, frame):
+        return frame.shape == self.frame_shape and frame.dtype == self.dtype
+
+    def acquire_slot(self, refs=1, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self.get_lock():
+                cursor = int(self.header[-1])
+                for step in range(self.slot_count):
+                    slot = (cursor + step) % self.slot_count
+                    if self.header[slot] == 0:
+                        self.header[slot] = refs
+                        self.header[-1] = (slot + 1) % self.slot_count
+                        return slot
+
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f'No free slot in frame buffer {self.name}')
+            time.sleep(0.001)
+
+    def put(self, frame, refs=1, timeout=None):
+        slot = self.acquire_slot(refs, timeout)
+        self.frames[slot] = frame
+        return slot
+
+    def get(self, slot):
+        return self.frames[slot]
+
+    def release(self, slot):
+        with self.get_lock():
+            if self.header[slot] <= 0:
+                raise ValueError(f'Slot {slot} of frame buffer {self.name} is not in use')
+            self.header[slot] -= 1
+
+    def get_free_slot_count(self):
+        return int((self.header[:-1] == 0).sum())
+
+    def close(self):
+        self.frames = None
+        self.header = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
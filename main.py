@@ -1,4 +1,4 @@
-from PyQt5.QtGui import QIcon
+from PyQt5.QtGui import QIcon, QPainter, QColor, QPen, QImage
 from PyQt5.QtWidgets import (
     QApplication,
     QMainWindow,
@@ -10,177 +10,225 @@ from PyQt5.QtWidgets import (
     QFileDialog,
     QLabel,
     QFrame,
-    QListWidgetItem, QScrollArea
+    QListWidgetItem, QScrollArea, QComboBox
 )
-from PyQt5.QtCore import QThread, pyqtSignal, QUrl, Qt
+from PyQt5.QtCore import QThread, QTimer, pyqtSignal, QUrl, Qt, QPointF
 from PyQt5.QtMultimedia import QMediaPlayer, QMediaContent
 from PyQt5.QtMultimediaWidgets import QVideoWidget
-from database_utils import insert_match, insert_team_and_stats, insert_player_and_stats, fetch_all_matches, \
-    fetch_all_teamstats, fetch_all_players, fetch_all_playerstats, fetch_match, fetch_all_teams, fetch_team_colors
+from database_utils import ensure_schema, fetch_matches_page
 import sys
 import os
-from utils import read_video
-from trackers import Tracker
-import cv2
-import numpy as np
-from team_assigner import TeamAssigner
-from player_ball_assigner import PlayerBallAssigner
-from camera_movement_estimator import CameraMovementEstimator
-from view_transformer import ViewTransformer
-from speed_and_distance_estimator import SpeedAndDistanceEstimator
+import json
+import time
+from datetime import datetime
+import psutil
+from processing_worker import ProcessingJob
+from detector_service import DetectorService
+from video_storage import get_video_storage
+from match_cache import MatchCache, load_match
+from metrics import start_metrics_server
+
+
+HISTORY_PAGE_SIZE = 50
+HISTORY_PREFETCH_ROWS = 10
+HEAVY_MODULES = ('torch', 'ultralytics', 'supervision', 'sklearn', 'pandas', 'cv2')
+
+
+def record_startup_time(startup_seconds):
+    report_path = os.getenv('startup_report_path', os.path.join('profiles', 'startup.jsonl'))
+    os.makedirs(os.path.dirname(report_path) or '.', exist_ok=True)
+    with open(report_path, 'a') as f:
+        f.write(json.dumps({
+            'started_at': datetime.now().isoformat(timespec='seconds'),
+            'seconds_to_first_window': startup_seconds,
+            'heavy_modules': [name for name in HEAVY_MODULES if name in sys.modules],
+        }) + '\n')
 
 
 class VideoProcessThread(QThread):
-    finished = pyqtSignal(str, dict)
+    finished = pyqtSignal(str, str, dict)
     progress = pyqtSignal(int)
+    stage_finished = pyqtSignal(str, float)
+    profile_written = pyqtSignal(str)
 
-    def __init__(self, video_path):
+    def __init__(self, video_path, detector_service=None):
         super().__init__()
         self.video_path = video_path
+        self.job = ProcessingJob(video_path, detector_service)
 
     def run(self):
+        self.job.start()
         try:
-            video_frames = read_video(self.video_path)
-
-            tracker = Tracker('models/best.pt')
-            tracks = tracker.get_object_tracks(video_frames, read_from_stub=False, stub_path='stubs/track_stubs.pkl')
-
-            tracker.add_position_to_tracks(tracks)
-
-            camera_movement_estimator = CameraMovementEstimator(video_frames[0])
-            camera_movement_per_frame = camera_movement_estimator.get_camera_movement(
-                video_frames, read_from_stub=False, stub_path='stubs/camera_movement_stub.pkl'
-            )
-            camera_movement_estimator.add_adjust_positions_to_tracks(tracks, camera_movement_per_frame)
-
-            view_transformer = ViewTransformer()
-            view_transformer.add_transformed_position_to_tracks(tracks)
-
-            tracks['ball'] = tracker.interpolate_ball_positions(tracks['ball'])
-
-            speed_and_distance_estimator = SpeedAndDistanceEstimator()
-            speed_and_distance_estimator.add_speed_and_distance_to_tracks(tracks)
-
-            team_assigner = TeamAssigner()
-            team_assigner.assign_team_color(video_frames[0], tracks['players'][0])
-            for frame_num, player_track in enumerate(tracks['players']):
-                for player_id, track in player_track.items():
-                    team = team_assigner.get_player_team(video_frames[frame_num], track['bbox'], player_id)
-                    tracks['players'][frame_num][player_id]['team'] = team
-                    tracks['players'][frame_num][player_id]['team_color'] = team_assigner.team_colors[team]
-
-            player_assigner = PlayerBallAssigner()
-            team_ball_control = []
-            for frame_num, player_track in enumerate(tracks['players']):
-                ball_bbox = tracks['ball'][frame_num][1]['bbox']
-                assigned_player = player_assigner.assign_ball_to_player(player_track, ball_bbox)
-                if assigned_player != -1:
-                    tracks['players'][frame_num][assigned_player]['has_ball'] = True
-                    team_ball_control.append(tracks['players'][frame_num][assigned_player]['team'])
-                else:
-                    if len(team_ball_control) > 0:
-                        team_ball_control.append(team_ball_control[-1])
-                    else:
-                        team_ball_control.append(0)
-
-            team_ball_control = np.array(team_ball_control)
-
-            output_video_frames = tracker.draw_annotations(video_frames, tracks, team_ball_control)
-            speed_and_distance_estimator.draw_speed_and_distance(output_video_frames, tracks)
-
-            stats = self.calculate_statistics(tracks, team_ball_control)
-
-            filename = os.path.basename(self.video_path)
-            base_name, ext = os.path.splitext(filename)
-            output_path = os.path.join('output_videos', f'processed_{base_name}.mp4')
-            os.makedirs('output_videos', exist_ok=True)
-
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            height, width = output_video_frames[0].shape[:2]
-            out = cv2.VideoWriter(output_path, fourcc, 30.0, (width, height))
-
-            for frame in output_video_frames:
-                out.write(frame)
-            out.release()
-
-            with open(output_path, 'rb') as f:
-                video_bytes = f.read()
-
-            match_id = insert_match(video_bytes, os.path.basename(output_path))
-
-            team_colors = {1: (0, 0, 0), 2: (0, 0, 0)}
-
-            for player_stats in stats['players'].values():
-                team = player_stats['team']
-                team_color = tuple(int(round(c)) for c in player_stats['team_color'])
-                if team in team_colors and team_colors[team] == (0, 0, 0):
-                    team_colors[team] = team_color
-
-            team1_poss = stats['team_possession']['team1']
-            team2_poss = stats['team_possession']['team2']
-
-            team1_color_str = ','.join(map(str, team_colors[1]))
-            team2_color_str = ','.join(map(str, team_colors[2]))
+            while not self.isInterruptionRequested():
+                event = self.job.get_event()
+                if event is None:
+                    continue
+
+                if event[0] == 'progress':
+                    self.progress.emit(event[1])
+                elif event[0] == 'stage':
+                    self.stage_finished.emit(event[1], event[2])
+                elif event[0] == 'profile':
+                    self.profile_written.emit(event[1])
+                elif event[0] == 'finished':
+                    _, output_path, match_id, stats = event
+                    self.finished.emit(output_path, match_id, stats)
+                    return
+                elif event[0] == 'error':
+                    print(f'Помилка обробки відео: {event[1]}')
+                    self.finished.emit('', '', {})
+                    return
+        finally:
+            self.job.close()
+
+    def cancel(self):
+        self.requestInterruption()
+        self.job.cancel()
+
+
+class MatchLoadThread(QThread):
+    loaded = pyqtSignal(str, str, dict)
+    failed = pyqtSignal(str, str)
+
+    def __init__(self, match_cache, video_storage, match_id, prefetch_match_ids=()):
+        super().__init__()
+        self.match_cache = match_cache
+        self.video_storage = video_storage
+        self.match_id = match_id
+        self.prefetch_match_ids = list(prefetch_match_ids)
 
-            team1_id = insert_team_and_stats(match_id, team1_color_str, int(team1_poss))
-            team2_id = insert_team_and_stats(match_id, team2_color_str, int(team2_poss))
+    def run(self):
+        try:
+            video_path, stats = load_match(self.match_cache, self.video_storage, self.match_id)
+            self.loaded.emit(self.match_id, video_path, stats)
+        except LookupError as e:
+            self.failed.emit(self.match_id, str(e))
+        except Exception as e:
+            print(f'Помилка завантаження матчу: {e}')
+            self.failed.emit(self.match_id, 'Не вдалося завантажити матч.')
 
-            for player_id, player_stats in stats['players'].items():
-                team = player_stats['team']
-                team_id = team1_id if team == 1 else team2_id
-                distance = player_stats['total_distance']
-                speed = player_stats['avg_speed']
-                insert_player_and_stats(team_id, match_id, int(player_id), distance, speed)
+        for match_id in self.prefetch_match_ids:
+            if self.isInterruptionRequested():
+                break
+            try:
+                load_match(self.match_cache, self.video_storage, match_id)
+            except Exception as e:
+                print(f'Помилка попереднього завантаження матчу: {e}')
 
-            self.finished.emit(output_path, stats)
 
-        except Exception as e:
-            print(f'Помилка обробки відео: {e}')
-            self.finished.emit('', {})
-
-    @staticmethod
-    def calculate_statistics(tracks, team_ball_control):
-        total_frames = len(team_ball_control)
-        if total_frames > 0:
-            team1_percentage = (team_ball_control == 1).sum() / total_frames * 100
-            team2_percentage = (team_ball_control == 2).sum() / total_frames * 100
-        else:
-            team1_percentage = 0
-            team2_percentage = 0
-
-        stats = {
-            'team_possession': {
-                'team1': team1_percentage,
-                'team2': team2_percentage
-            },
-            'players': {}
-        }
+class TimelineChart(QWidget):
+    def __init__(self):
+        super().__init__()
+        self.timeline = None
+        self.team_colors = {}
+        self.setMinimumHeight(220)
+
+    def set_timeline(self, timeline, team_colors):
+        self.timeline = timeline
+        self.team_colors = team_colors
+        self.update()
+
+    def get_team_color(self, team):
+        color = self.team_colors.get(team)
+        if color is None:
+            return QColor('#2980b9') if team == 1 else QColor('#e74c3c')
+        return QColor(int(color[0]), int(color[1]), int(color[2]))
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+
+        if self.timeline is None or len(self.timeline['possession']) == 0:
+            painter.setPen(QColor('#7f8c8d'))
+            painter.drawText(self.rect(), Qt.AlignCenter, 'Немає даних')
+            return
 
-        for player_id in tracks['players'][-2].keys():
-            player_speeds = []
-            for frame in tracks['players']:
-                if player_id in frame and 'speed' in frame[player_id]:
-                    player_speeds.append(frame[player_id]['speed'])
+        left, width = 40, self.width() - 50
+        bars_top, bars_height = 20, self.height() * 0.45 - 20
+        lines_top = bars_top + bars_height + 30
+        lines_height = self.height() - lines_top - 10
+
+        painter.setPen(QColor('#2c3e50'))
+        painter.drawText(left, bars_top - 5, 'Володіння по хвилинах, %')
+        painter.drawText(left, int(lines_top - 5), 'Середня швидкість команд, км/год')
+
+        possession = self.timeline['possession']
+        bar_width = width / len(possession)
+        painter.setPen(Qt.NoPen)
+        for i, (team1, team2) in enumerate(possession):
+            x = left + i * bar_width
+            bottom = bars_top + bars_height
+            painter.setBrush(QColor('#bdc3c7'))
+            painter.drawRect(int(x + 1), int(bars_top), max(1, int(bar_width - 2)), int(bars_height))
+            for team, share in ((1, team1), (2, team2)):
+                height = bars_height * share / 100
+                painter.setBrush(self.get_team_color(team))
+                painter.drawRect(int(x + 1), int(bottom - height), max(1, int(bar_width - 2)), int(height))
+                bottom -= height
+
+        times = self.timeline['team_speed_time']
+        team_speed = self.timeline['team_speed']
+        if len(times) == 0:
+            return
+        max_time = max(float(times[-1]), 1)
+        valid_speed = team_speed[team_speed == team_speed]
+        max_speed = max(float(valid_speed.max()) if len(valid_speed) else 0, 1)
+
+        painter.setPen(QColor('#7f8c8d'))
+        painter.drawText(0, int(lines_top + 10), f'{max_speed:.0f}')
+        painter.drawText(0, int(lines_top + lines_height), '0')
+
+        for team in (1, 2):
+            painter.setPen(QPen(self.get_team_color(team), 2))
+            previous = None
+            for time_value, speed in zip(times, team_speed[:, team - 1]):
+                if speed != speed:
+                    previous = None
+                    continue
+                point = QPointF(left + width * float(time_value) / max_time,
+                                lines_top + lines_height * (1 - float(speed) / max_speed))
+                if previous is not None:
+                    painter.drawLine(previous, point)
+                previous = point
+
+
+class HeatmapView(QWidget):
+    def __init__(self):
+        super().__init__()
+        self.heatmap = None
+        self.color = QColor('#e74c3c')
+        self.setMinimumHeight(180)
 
-            if player_speeds:
-                avg_speed = sum(player_speeds) / len(player_speeds)
-            else:
-                avg_speed = 0
+    def set_heatmap(self, heatmap, color=None):
+        self.heatmap = heatmap
+        self.color = color or QColor('#e74c3c')
+        self.update()
 
-            last_frame = tracks['players'][-2]
-            if player_id in last_frame:
-                team = last_frame[player_id]['team']
-                team_color = last_frame[player_id]['team_color'] if 'team_color' in last_frame[player_id] else (0, 0, 0)
-                total_distance = last_frame[player_id].get('distance', 0)
+    def paintEvent(self, event):
+        painter = QPainter(self)
 
-                stats['players'][player_id] = {
-                    'avg_speed': avg_speed,
-                    'total_distance': total_distance,
-                    'team': team,
-                    'team_color': team_color
-                }
+        if self.heatmap is None or not self.heatmap.any():
+            painter.setPen(QColor('#7f8c8d'))
+            painter.drawText(self.rect(), Qt.AlignCenter, 'Немає даних')
+            return
 
-        return stats
+        # grid rows follow the pitch length, so transpose to draw the length horizontally
+        heatmap = self.heatmap.T[::-1]
+        rows, cols = heatmap.shape
+        scale = heatmap.max()
+        image = QImage(cols, rows, QImage.Format_ARGB32)
+        for y in range(rows):
+            for x in range(cols):
+                color = QColor(self.color)
+                color.setAlpha(int(255 * heatmap[y, x] / scale))
+                image.setPixelColor(x, y, color)
+
+        target = self.rect().adjusted(5, 5, -5, -5)
+        painter.fillRect(target, QColor(60, 140, 60))
+        painter.setRenderHint(QPainter.SmoothPixmapTransform)
+        painter.drawImage(target, image)
+        painter.setPen(QPen(QColor(245, 245, 245), 2))
+        painter.drawRect(target)
 
 
 class Window(QMainWindow):
@@ -253,6 +301,8 @@ class Window(QMainWindow):
 
         self.processed_videos = {}
         self.current_video = None
+        self.video_storage = get_video_storage()
+        self.match_cache = MatchCache()
 
         self.upload_button = None
         self.video_list = None
@@ -273,22 +323,51 @@ class Window(QMainWindow):
         self.team2_color = None
         self.team2_possession = None
         self.players_stats_container = None
-        self.processing_thread = None
+        self.processing_threads = set()
+        self.job_percentages = {}
+        self.load_threads = set()
+        self.listed_match_ids = set()
+        self.history_cursor = None
+        self.history_exhausted = False
+        self.startup_reported = False
+        self.detector_service = DetectorService()
 
         self.init_ui()
         self.load_video_history()
 
     def load_video_history(self):
         self.video_list.clear()
-        matches = fetch_all_matches()
+        self.listed_match_ids = set()
+        self.history_cursor = None
+        self.history_exhausted = False
+        self.load_next_history_page()
+
+    def load_next_history_page(self):
+        if self.history_exhausted:
+            return
+
+        matches, self.history_cursor = fetch_matches_page(self.history_cursor, HISTORY_PAGE_SIZE)
+        self.history_exhausted = self.history_cursor is None
+
         for match in matches:
-            video_name = match['match_video_name']
-            match_id = match['match_id']
+            if match['match_id'] in self.listed_match_ids:
+                continue
+            self.listed_match_ids.add(match['match_id'])
 
-            item = QListWidgetItem(video_name)
-            item.setData(Qt.UserRole, match_id)
+            item = QListWidgetItem(match['match_video_name'])
+            item.setData(Qt.UserRole, match['match_id'])
             self.video_list.addItem(item)
 
+        QTimer.singleShot(0, self.fill_history_viewport)
+
+    def fill_history_viewport(self):
+        if self.video_list.isVisible() and self.video_list.verticalScrollBar().maximum() == 0:
+            self.load_next_history_page()
+
+    def video_list_scrolled(self, value):
+        if value >= self.video_list.verticalScrollBar().maximum() - HISTORY_PREFETCH_ROWS:
+            self.load_next_history_page()
+
     def init_ui(self):
         main_layout = QHBoxLayout()
         main_layout.setSpacing(15)
@@ -347,6 +426,7 @@ class Window(QMainWindow):
             }
         """)
         self.video_list.currentItemChanged.connect(self.video_selected)
+        self.video_list.verticalScrollBar().valueChanged.connect(self.video_list_scrolled)
         list_container.addWidget(self.video_list)
         left_panel.addLayout(list_container)
 
@@ -482,6 +562,29 @@ class Window(QMainWindow):
 
         self.stats_container.addWidget(possession_container)
 
+        self.timeline_title = QLabel('Динаміка матчу:')
+        self.timeline_title.setStyleSheet(
+            'font-size: 16px; font-weight: bold; margin-top: 15px; margin-bottom: 10px; color: #2c3e50;')
+        self.stats_container.addWidget(self.timeline_title)
+
+        self.timeline_chart = TimelineChart()
+        self.timeline_chart.setStyleSheet("background-color: #ecf0f1; border-radius: 6px;")
+        self.stats_container.addWidget(self.timeline_chart)
+
+        self.heatmap_title = QLabel('Теплова карта:')
+        self.heatmap_title.setStyleSheet(
+            'font-size: 16px; font-weight: bold; margin-top: 15px; margin-bottom: 10px; color: #2c3e50;')
+        self.stats_container.addWidget(self.heatmap_title)
+
+        self.heatmap_selector = QComboBox()
+        self.heatmap_selector.currentIndexChanged.connect(self.show_heatmap)
+        self.stats_container.addWidget(self.heatmap_selector)
+
+        self.heatmap_view = HeatmapView()
+        self.stats_container.addWidget(self.heatmap_view)
+        self.heatmaps = None
+        self.heatmap_team_colors = {}
+
         players_title = QLabel('Статистика гравців:')
         players_title.setStyleSheet(
             'font-size: 16px; font-weight: bold; margin-top: 15px; margin-bottom: 10px; color: #2c3e50;')
@@ -539,82 +642,87 @@ class Window(QMainWindow):
         )
 
         if file_path:
-            self.progress_label.show()
-            self.progress_label.setText(f'Обробка відео: {os.path.basename(file_path)}...')
-
-            self.processing_thread = VideoProcessThread(file_path)
-            self.processing_thread.finished.connect(self.video_processed)
-            self.processing_thread.start()
-
-    def video_processed(self, output_path, stats):
-        self.progress_label.hide()
-
-        if output_path:
-            video_name = os.path.basename(output_path)
+            processing_thread = VideoProcessThread(file_path, self.detector_service)
+            processing_thread.finished.connect(
+                lambda output_path, match_id, stats: self.job_finished(processing_thread, output_path, match_id, stats)
+            )
+            processing_thread.progress.connect(lambda percent: self.job_progress(processing_thread, percent))
+            processing_thread.profile_written.connect(lambda profile_path: print(f'Профіль обробки: {profile_path}'))
+            self.processing_threads = {thread for thread in self.processing_threads if not thread.isFinished()}
+            self.processing_threads.add(processing_thread)
+            self.job_progress(processing_thread, 0)
+            processing_thread.start()
+
+    def job_progress(self, processing_thread, percent):
+        self.job_percentages[processing_thread] = percent
+        self.update_progress_label()
+
+    def job_finished(self, processing_thread, output_path, match_id, stats):
+        self.job_percentages.pop(processing_thread, None)
+        self.update_progress_label()
+        self.video_processed(output_path, match_id, stats)
+
+    def update_progress_label(self):
+        if not self.job_percentages:
+            self.progress_label.hide()
+            return
 
-            matches = fetch_all_matches()
-            match = next((m for m in matches if m['match_video_name'] == video_name), None)
+        lines = [
+            f'Обробка відео: {os.path.basename(thread.video_path)}... {percent}%'
+            for thread, percent in self.job_percentages.items()
+        ]
+        self.progress_label.setText('\n'.join(lines))
+        self.progress_label.show()
 
-            if match:
-                item = QListWidgetItem(video_name)
-                item.setData(Qt.UserRole, match['match_id'])
-                self.video_list.addItem(item)
-                self.video_list.setCurrentItem(item)
+    def video_processed(self, output_path, match_id, stats):
+        if output_path and match_id:
+            self.listed_match_ids.add(match_id)
 
+            item = QListWidgetItem(os.path.basename(output_path))
+            item.setData(Qt.UserRole, match_id)
+            self.video_list.insertItem(0, item)
+            self.video_list.setCurrentItem(item)
 
     def video_selected(self, current):
         if current:
-            video_name = current.text()
             match_id = current.data(Qt.UserRole)
 
-            video = fetch_match(match_id)
-
-            if not video:
-                self.show_error_message('Відео не знайдено в базі даних.')
-                return
-
-            video_bytes = video[0]
-            temp_path = os.path.join("temp", f"{video_name}")
-            os.makedirs("temp", exist_ok=True)
-            with open(temp_path, 'wb') as f:
-                f.write(video_bytes)
-
-            self.current_video = temp_path
-            self.load_video(temp_path)
-
-            team_colors_map = fetch_team_colors(match_id)
+            row = self.video_list.row(current)
+            prefetch_match_ids = []
+            for neighbor_row in (row + 1, row - 1):
+                neighbor = self.video_list.item(neighbor_row)
+                if neighbor is not None:
+                    prefetch_match_ids.append(neighbor.data(Qt.UserRole))
 
-            teamstats = fetch_all_teamstats()
-            teamstats = [t for t in teamstats if t['match_id'] == match_id]
+            for load_thread in self.load_threads:
+                load_thread.requestInterruption()
 
-            players = fetch_all_players()
-            players = [p for p in players if p['match_id'] == match_id]
-
-            playerstats = fetch_all_playerstats()
-            playerstats = [s for s in playerstats if s['match_id'] == match_id]
+            self.player_status.setText('Завантаження...')
+            self.player_status.setStyleSheet("color: #7f8c8d; font-style: italic;")
 
-            stats = {
-                'team_possession': {},
-                'players': {}
-            }
+            load_thread = MatchLoadThread(self.match_cache, self.video_storage, match_id, prefetch_match_ids)
+            load_thread.loaded.connect(self.match_loaded)
+            load_thread.failed.connect(self.match_load_failed)
+            load_thread.finished.connect(lambda: self.load_threads.discard(load_thread))
+            self.load_threads.add(load_thread)
+            load_thread.start()
 
-            for t in teamstats:
-                color = t['team_id'][-1]
-                key = 'team1' if color in ('1', 'a', 'b') else 'team2'
-                stats['team_possession'][key] = t['ball_possession']
+    def get_current_match_id(self):
+        current = self.video_list.currentItem()
+        return current.data(Qt.UserRole) if current is not None else None
 
-            for p in players:
-                stat = next((s for s in playerstats if s['player_id'] == p['player_id']), None)
-                if stat:
-                    stats['players'][p['player_number']] = {
-                        'avg_speed': stat['avg_speed'],
-                        'total_distance': stat['distance'],
-                        'team': 1 if p['team_id'] == teamstats[0]['team_id'] else 2,
-                        'team_color': tuple(int(round(float(c))) for c in team_colors_map.get(p['team_id'], (0, 0, 0)))
-                    }
+    def match_loaded(self, match_id, video_path, stats):
+        if match_id != self.get_current_match_id():
+            return
 
-            self.display_statistics(stats)
+        self.match_cache.pin(match_id)
+        self.current_video = video_path
+        self.load_video(video_path)
+        self.display_statistics(stats)
 
+    def match_load_failed(self, match_id, message):
+        if match_id == self.get_current_match_id():
+            self.show_error_message(message)
 
     def show_error_message(self, message):
         self.player_status.setText(f'ПОМИЛКА: {message}')
@@ -679,9 +787,33 @@ class Window(QMainWindow):
         else:
             self.player_status.setStyleSheet("color: #7f8c8d; font-style: italic;")
 
+    def show_heatmap(self):
+        selection = self.heatmap_selector.currentData()
+        if self.heatmaps is None or selection is None:
+            self.heatmap_view.set_heatmap(None)
+            return
+
+        kind, index = selection
+        if kind == 'team':
+            heatmap = self.heatmaps['team_heatmaps'][index]
+            team = index + 1
+        else:
+            heatmap = self.heatmaps['player_heatmaps'][index]
+            team = int(self.heatmaps['player_teams'][index])
+
+        color = self.heatmap_team_colors.get(team)
+        if color is not None:
+            color = QColor(int(color[0]), int(color[1]), int(color[2]))
+        self.heatmap_view.set_heatmap(heatmap, color)
+
     def display_statistics(self, stats):
         self.clear_layout(self.players_stats_container)
 
+        team_colors = dict(stats.get('team_colors', {}))
+        if not team_colors:
+            for player_stats in stats.get('players', {}).values():
+                team_colors.setdefault(player_stats['team'], player_stats['team_color'])
+
         if 'team_possession' in stats:
             team1_possession = stats['team_possession'].get('team1', 0)
             team2_possession = stats['team_possession'].get('team2', 0)
@@ -689,29 +821,39 @@ class Window(QMainWindow):
             self.team1_possession.setText(f'{team1_possession:.1f}%')
             self.team2_possession.setText(f'{team2_possession:.1f}%')
 
-            match_id = self.video_list.currentItem().data(Qt.UserRole)
-            team_colors_raw = fetch_team_colors(match_id)
-
-            if 'players' in stats and stats['players']:
-                team_colors = {}
-                for team_id, color_tuple in team_colors_raw.items():
-                    color = tuple(int(round(float(c))) for c in color_tuple)
-                    key = 1 if team_id == list(team_colors_raw.keys())[0] else 2
-                    team_colors[key] = color
-
-                if 1 in team_colors:
-                    color = team_colors[1]
-                    self.team1_color.setStyleSheet(
-                        f'background-color: rgb({color[0]}, {color[1]}, {color[2]}); '
-                        f'border: 1px solid #bdc3c7; border-radius: 3px;'
-                    )
-
-                if 2 in team_colors:
-                    color = team_colors[2]
-                    self.team2_color.setStyleSheet(
-                        f'background-color: rgb({color[0]}, {color[1]}, {color[2]}); '
-                        f'border: 1px solid #bdc3c7; border-radius: 3px;'
-                    )
+            if 1 in team_colors:
+                color = team_colors[1]
+                self.team1_color.setStyleSheet(
+                    f'background-color: rgb({color[0]}, {color[1]}, {color[2]}); '
+                    f'border: 1px solid #bdc3c7; border-radius: 3px;'
+                )
+
+            if 2 in team_colors:
+                color = team_colors[2]
+                self.team2_color.setStyleSheet(
+                    f'background-color: rgb({color[0]}, {color[1]}, {color[2]}); '
+                    f'border: 1px solid #bdc3c7; border-radius: 3px;'
+                )
+
+        timeline = stats.get('analytics', {}).get('timeline')
+        self.timeline_title.setVisible(timeline is not None)
+        self.timeline_chart.setVisible(timeline is not None)
+        if timeline is not None:
+            self.timeline_chart.set_timeline(timeline, team_colors)
+
+        self.heatmaps = stats.get('analytics', {}).get('heatmaps')
+        self.heatmap_team_colors = team_colors
+        for widget in (self.heatmap_title, self.heatmap_selector, self.heatmap_view):
+            widget.setVisible(self.heatmaps is not None)
+        self.heatmap_selector.blockSignals(True)
+        self.heatmap_selector.clear()
+        if self.heatmaps is not None:
+            self.heatmap_selector.addItem('Команда 1', ('team', 0))
+            self.heatmap_selector.addItem('Команда 2', ('team', 1))
+            for i, player_id in enumerate(self.heatmaps['player_ids'].tolist()):
+                self.heatmap_selector.addItem(f'Гравець {player_id}', ('player', i))
+        self.heatmap_selector.blockSignals(False)
+        self.show_heatmap()
 
         if 'players' in stats:
             for player_id, player_stats in stats['players'].items():
@@ -775,6 +917,34 @@ class Window(QMainWindow):
 
                 self.players_stats_container.addWidget(player_card)
 
+    def showEvent(self, event):
+        super().showEvent(event)
+        QTimer.singleShot(0, self.fill_history_viewport)
+        if not self.startup_reported:
+            self.startup_reported = True
+            QTimer.singleShot(0, self.report_startup_time)
+
+    def report_startup_time(self):
+        startup_seconds = time.time() - psutil.Process().create_time()
+        print(f'Вікно відкрито за {startup_seconds:.2f} с')
+        try:
+            record_startup_time(startup_seconds)
+        except OSError as e:
+            print(f'Помилка запису часу запуску: {e}')
+
+        if os.getenv('exit_after_startup'):
+            QApplication.quit()
+
+    def closeEvent(self, event):
+        for processing_thread in list(self.processing_threads):
+            processing_thread.cancel()
+            processing_thread.wait()
+        for load_thread in list(self.load_threads):
+            load_thread.requestInterruption()
+            load_thread.wait()
+        self.detector_service.stop()
+        super().closeEvent(event)
+
     def clear_layout(self, layout):
         if layout is not None:
             while layout.count():
@@ -787,6 +957,12 @@ class Window(QMainWindow):
 
 
 def application():
+    ensure_schema()
+    try:
+        start_metrics_server()
+    except OSError as e:
+        print(f'Помилка запуску сервера метрик: {e}')
+
     app = QApplication(sys.argv)
     window = Window()
     window.show()
@@ -0,0 +1,4 @@
+from .codec import FORMAT_VERSION, pack_arrays, unpack_arrays
+from .track_table import flatten_object_tracks, get_point_column
+from .timeline import calculate_timeline
+from .heatmap import calculate_heatmaps
@@ -0,0 +1,21 @@
+import io
+
+import numpy as np
+
+FORMAT_VERSION = 1
+
+
+def pack_arrays(arrays):
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, format_version=np.array(FORMAT_VERSION), **arrays)
+    return buffer.getvalue()
+
+
+def unpack_arrays(data):
+    with np.load(io.BytesIO(data), allow_pickle=False) as archive:
+        arrays = {name: archive[name] for name in archive.files}
+
+    format_version = int(arrays.pop('format_version', -1))
+    if format_version != FORMAT_VERSION:
+        raise ValueError(f'Unsupported analytics format version: {format_version}')
+    return arrays
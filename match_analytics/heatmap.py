@@ -0,0 +1,31 @@
+import numpy as np
+
+from .track_table import flatten_object_tracks, get_point_column
+
+
+def calculate_heatmaps(object_tracks, player_teams, pitch_size, bins=(12, 34), frame_rate=24):
+    columns, rows = flatten_object_tracks(object_tracks)
+    positions = get_point_column(rows, 'position_transformed')
+
+    valid = ~np.isnan(positions).any(axis=1)
+    player_ids, player_index = np.unique(columns['track_id'], return_inverse=True)
+    player_count = len(player_ids)
+    cell_count = bins[0] * bins[1]
+
+    # np.histogram2d per player would rescan all rows; one bincount over a combined index fills every grid at once
+    cell_x = np.clip((positions[valid, 0] / pitch_size[0] * bins[0]).astype(np.int64), 0, bins[0] - 1)
+    cell_y = np.clip((positions[valid, 1] / pitch_size[1] * bins[1]).astype(np.int64), 0, bins[1] - 1)
+    cells = player_index[valid] * cell_count + cell_x * bins[1] + cell_y
+    player_heatmaps = np.bincount(cells, minlength=player_count * cell_count).reshape(player_count, *bins)
+
+    teams = np.array([player_teams.get(player_id, 0) for player_id in player_ids.tolist()], dtype=np.int64)
+    team_heatmaps = np.stack([player_heatmaps[teams == team].sum(axis=0) for team in (1, 2)])
+
+    return {
+        'pitch_size': np.array(pitch_size, dtype=np.float32),
+        'frame_rate': np.array(frame_rate, dtype=np.float32),
+        'player_ids': player_ids,
+        'player_teams': teams,
+        'player_heatmaps': (player_heatmaps / frame_rate).astype(np.float32),
+        'team_heatmaps': (team_heatmaps / frame_rate).astype(np.float32),
+    }
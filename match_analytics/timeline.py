@@ -0,0 +1,92 @@
+import numpy as np
+
+from .track_table import flatten_object_tracks
+
+
+def get_possession_per_window(team_ball_control, window_frames):
+    team_ball_control = np.asarray(team_ball_control)
+    window_index = np.arange(len(team_ball_control)) // window_frames
+    window_count = int(window_index[-1]) + 1 if len(window_index) else 0
+    frames_per_window = np.bincount(window_index, minlength=window_count)
+
+    possession = np.zeros((window_count, 2))
+    for team in (1, 2):
+        team_frames = np.bincount(window_index, weights=team_ball_control == team, minlength=window_count)
+        possession[:, team - 1] = team_frames / frames_per_window * 100
+
+    return possession
+
+
+def get_rolling_team_speed(columns, frame_count, rolling_frames, sample_frames):
+    frames = columns['frame']
+    teams = columns['team']
+    speeds = columns['speed']
+
+    valid = ~np.isnan(speeds) & ((teams == 1) | (teams == 2))
+    slots = frames[valid] * 2 + teams[valid].astype(np.int64) - 1
+    speed_sum = np.bincount(slots, weights=speeds[valid], minlength=frame_count * 2).reshape(frame_count, 2)
+    speed_count = np.bincount(slots, minlength=frame_count * 2).reshape(frame_count, 2)
+
+    cumulative_sum = np.vstack([np.zeros((1, 2)), np.cumsum(speed_sum, axis=0)])
+    cumulative_count = np.vstack([np.zeros((1, 2)), np.cumsum(speed_count, axis=0)])
+
+    sample_end = np.arange(sample_frames, frame_count + 1, sample_frames)
+    if len(sample_end) == 0 and frame_count > 0:
+        sample_end = np.array([frame_count])
+    sample_start = np.maximum(sample_end - rolling_frames, 0)
+
+    window_sum = cumulative_sum[sample_end] - cumulative_sum[sample_start]
+    window_count = cumulative_count[sample_end] - cumulative_count[sample_start]
+    team_speed = np.divide(window_sum, window_count, out=np.full(window_sum.shape, np.nan), where=window_count > 0)
+
+    return sample_end, team_speed
+
+
+def get_player_speed_percentiles(columns, window_frames, window_count, percentiles):
+    player_ids, player_index = np.unique(columns['track_id'], return_inverse=True)
+    player_count = len(player_ids)
+
+    valid = ~np.isnan(columns['speed'])
+    groups = (columns['frame'][valid] // window_frames) * player_count + player_index[valid]
+    speeds = columns['speed'][valid]
+
+    order = np.lexsort((speeds, groups))
+    sorted_speeds = speeds[order]
+    group_ids, group_starts, group_sizes = np.unique(groups[order], return_index=True, return_counts=True)
+
+    result = np.full((window_count * player_count, len(percentiles)), np.nan)
+    for i, percentile in enumerate(percentiles):
+        position = group_starts + percentile / 100 * (group_sizes - 1)
+        lower = np.floor(position).astype(np.int64)
+        upper = np.ceil(position).astype(np.int64)
+        fraction = position - lower
+        result[group_ids, i] = sorted_speeds[lower] + (sorted_speeds[upper] - sorted_speeds[lower]) * fraction
+
+    return player_ids, result.reshape(window_count, player_count, len(percentiles))
+
+
+def calculate_timeline(tracks, team_ball_control, frame_rate=24, window_seconds=60, rolling_seconds=10,
+                       percentiles=(50, 90)):
+    frame_count = len(tracks['players'])
+    window_frames = int(window_seconds * frame_rate)
+    columns, _ = flatten_object_tracks(tracks['players'], ('speed', 'team'))
+
+    possession = get_possession_per_window(team_ball_control, window_frames)
+    sample_end, team_speed = get_rolling_team_speed(columns, frame_count, int(rolling_seconds * frame_rate),
+                                                    int(frame_rate))
+    player_ids, player_speed_percentiles = get_player_speed_percentiles(
+        columns, window_frames, len(possession), percentiles
+    )
+
+    return {
+        'frame_rate': np.array(frame_rate, dtype=np.float32),
+        'window_seconds': np.array(window_seconds, dtype=np.float32),
+        'rolling_seconds': np.array(rolling_seconds, dtype=np.float32),
+        'possession_window_start': (np.arange(len(possession)) * window_seconds).astype(np.float32),
+        'possession': possession.astype(np.float32),
+        'team_speed_time': (sample_end / frame_rate).astype(np.float32),
+        'team_speed': team_speed.astype(np.float32),
+        'player_ids': player_ids,
+        'speed_percentiles': np.array(percentiles, dtype=np.float32),
+        'player_speed_percentiles': player_speed_percentiles.astype(np.float32),
+    }
@@ -0,0 +1,23 @@
+import numpy as np
+
+
+def flatten_object_tracks(object_tracks, fields=()):
+    rows = [track_info for frame in object_tracks for track_info in frame.values()]
+    columns = {
+        'frame': np.repeat(np.arange(len(object_tracks)), [len(frame) for frame in object_tracks]),
+        'track_id': np.array([track_id for frame in object_tracks for track_id in frame], dtype=np.int64),
+    }
+    for field in fields:
+        columns[field] = np.fromiter((row.get(field, np.nan) for row in rows), dtype=np.float64, count=len(rows))
+
+    return columns, rows
+
+
+def get_point_column(rows, field):
+    points = np.full((len(rows), 2), np.nan)
+    for i, row in enumerate(rows):
+        point = row.get(field)
+        if point is not None:
+            points[i] = point
+    return points
+
@@ -0,0 +1,2 @@
+from .match_cache import MatchCache
+from .match_loader import load_match
@@ -0,0 +1,93 @@
+import os
+import shutil
+import threading
+from collections import OrderedDict
+
+
+class MatchCache:
+    def __init__(self, video_dir=os.path.join('temp', 'match_cache'), max_stats=64, max_video_bytes=2 * 1024 ** 3):
+        self.video_dir = video_dir
+        self.max_stats = max_stats
+        self.max_video_bytes = max_video_bytes
+
+        self.lock = threading.RLock()
+        self.stats = OrderedDict()
+        self.videos = OrderedDict()
+        self.video_bytes = 0
+        self.pinned_match_id = None
+        self.loading_locks = {}
+
+        shutil.rmtree(self.video_dir, ignore_errors=True)
+        os.makedirs(self.video_dir, exist_ok=True)
+
+    def get_video_cache_path(self, match_id):
+        return os.path.join(self.video_dir, f'{match_id}.mp4')
+
+    def get_loading_lock(self, match_id):
+        with self.lock:
+            if match_id not in self.loading_locks:
+                self.loading_locks[match_id] = threading.Lock()
+            return self.loading_locks[match_id]
+
+    def get_stats(self, match_id):
+        with self.lock:
+            if match_id not in self.stats:
+                return None
+            self.stats.move_to_end(match_id)
+            return self.stats[match_id]
+
+    def put_stats(self, match_id, stats):
+        with self.lock:
+            self.stats[match_id] = stats
+            self.stats.move_to_end(match_id)
+            while len(self.stats) > self.max_stats:
+                self.stats.popitem(last=False)
+
+    def get_video_path(self, match_id):
+        with self.lock:
+            if match_id not in self.videos:
+                return None
+
+            video_path, _, _ = self.videos[match_id]
+            if not os.path.exists(video_path):
+                self.remove_video(match_id)
+                return None
+
+            self.videos.move_to_end(match_id)
+            return video_path
+
+    def put_video(self, match_id, video_path, owned=True):
+        with self.lock:
+            if match_id in self.videos and self.videos[match_id][0] != video_path:
+                self.remove_video(match_id)
+
+            size = os.path.getsize(video_path) if owned else 0
+            if match_id in self.videos:
+                self.video_bytes -= self.videos[match_id][1]
+            self.videos[match_id] = (video_path, size, owned)
+            self.videos.move_to_end(match_id)
+            self.video_bytes += size
+
+            self.evict_videos()
+
+    def evict_videos(self):
+        for match_id in list(self.videos):
+            if self.video_bytes <= self.max_video_bytes:
+                break
+            if match_id == self.pinned_match_id or len(self.videos) == 1:
+                continue
+            self.remove_video(match_id)
+
+    def remove_video(self, match_id):
+        video_path, size, owned = self.videos.pop(match_id)
+        self.video_bytes -= size
+        if owned:
+            try:
+                os.remove(video_path)
+            except OSError:
+                pass
+
+    def pin(self, match_id):
+        with self.lock:
+            self.pinned_match_id = match_id
+            self.evict_videos()
@@ -0,0 +1,50 @@
+from database_utils import fetch_match_video, fetch_match_stats, fetch_match_analytics
+from video_storage import materialize_video
+
+
+def load_match_video(match_cache, video_storage, match_id):
+    video_path = match_cache.get_video_path(match_id)
+    if video_path is not None:
+        return video_path
+
+    video = fetch_match_video(match_id)
+    if not video:
+        raise LookupError('Відео не знайдено в базі даних.')
+
+    video_ref, video_bytes = video
+    cache_path = match_cache.get_video_cache_path(match_id)
+    if video_ref is not None:
+        try:
+            video_path = materialize_video(video_storage, video_ref, cache_path)
+        except OSError:
+            raise LookupError('Відео не знайдено у сховищі.')
+    else:
+        with open(cache_path, 'wb') as f:
+            f.write(video_bytes)
+        video_path = cache_path
+
+    match_cache.put_video(match_id, video_path, owned=video_path == cache_path)
+    return video_path
+
+
+def load_match_stats(match_cache, match_id):
+    stats = match_cache.get_stats(match_id)
+    if stats is None:
+        from match_analytics import unpack_arrays
+
+        stats = fetch_match_stats(match_id)
+        stats['analytics'] = {}
+        for kind, data in fetch_match_analytics(match_id).items():
+            try:
+                stats['analytics'][kind] = unpack_arrays(data)
+            except ValueError as e:
+                print(f'Помилка читання аналітики {kind}: {e}')
+        match_cache.put_stats(match_id, stats)
+    return stats
+
+
+def load_match(match_cache, video_storage, match_id):
+    with match_cache.get_loading_lock(match_id):
+        video_path = load_match_video(match_cache, video_storage, match_id)
+        stats = load_match_stats(match_cache, match_id)
+    return video_path, stats
@@ -0,0 +1,13 @@
+from .metrics import (
+    FRAMES_PROCESSED,
+    JOBS,
+    ACTIVE_JOBS,
+    STAGE_SECONDS,
+    DETECTOR_BATCH_SECONDS,
+    DETECTOR_COLD_START_SECONDS,
+    DETECTOR_FRAMES,
+    CAMERA_MOTION_FRAMES,
+    DATABASE_WRITE_SECONDS,
+    QUEUE_DEPTH,
+)
+from .server import start_metrics_server, mark_process_dead
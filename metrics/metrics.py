@@ -0,0 +1,72 @@
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def configure_multiprocess_dir():
+    if not os.getenv('metrics_port') or 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        return
+
+    metrics_dir = os.path.abspath(os.path.join(os.getenv('metrics_dir', 'temp/metrics'), str(os.getpid())))
+    os.makedirs(metrics_dir, exist_ok=True)
+    os.environ['PROMETHEUS_MULTIPROC_DIR'] = metrics_dir
+
+
+# prometheus_client picks its multiprocess value class on import, so the directory
+# has to be in the environment before it is imported here or in the spawned workers.
+configure_multiprocess_dir()
+
+from prometheus_client import Counter, Gauge, Histogram  # noqa: E402
+
+FRAMES_PROCESSED = Counter(
+    'football_frames_processed',
+    'Frames of successfully processed videos'
+)
+JOBS = Counter(
+    'football_jobs',
+    'Finished processing jobs by outcome',
+    ['status']
+)
+ACTIVE_JOBS = Gauge(
+    'football_active_jobs',
+    'Processing jobs currently running',
+    multiprocess_mode='livesum'
+)
+STAGE_SECONDS = Histogram(
+    'football_stage_seconds',
+    'Wall time of a computed pipeline stage',
+    ['stage'],
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+)
+DETECTOR_BATCH_SECONDS = Histogram(
+    'football_detector_batch_seconds',
+    'Latency of one detector batch',
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30)
+)
+DETECTOR_COLD_START_SECONDS = Histogram(
+    'football_detector_cold_start_seconds',
+    'Model load and warm-up time of a detector service start',
+    buckets=(0.5, 1, 2.5, 5, 10, 30, 60, 120)
+)
+DETECTOR_FRAMES = Counter(
+    'football_detector_frames',
+    'Frames passed through the detector'
+)
+CAMERA_MOTION_FRAMES = Counter(
+    'football_camera_motion_frames',
+    'Frames checked for camera movement by how the movement was estimated',
+    ['method']
+)
+DATABASE_WRITE_SECONDS = Histogram(
+    'football_database_write_seconds',
+    'Time to store the processed video and save the match results',
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+QUEUE_DEPTH = Gauge(
+    'football_queue_depth',
+    'Items waiting in a processing queue',
+    ['queue'],
+    multiprocess_mode='livesum'
+)
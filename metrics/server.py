@@ -0,0 +1,30 @@
+import atexit
+import os
+import shutil
+
+from prometheus_client import REGISTRY, CollectorRegistry, multiprocess, start_http_server
+
+
+def start_metrics_server(port=None, address=None):
+    if port is None:
+        port = os.getenv('metrics_port')
+    if not port:
+        return None
+    if address is None:
+        address = os.getenv('metrics_address', '127.0.0.1')
+
+    metrics_dir = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+    if metrics_dir is not None:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        atexit.register(shutil.rmtree, metrics_dir, ignore_errors=True)
+    else:
+        registry = REGISTRY
+
+    start_http_server(int(port), addr=address, registry=registry)
+    return int(port)
+
+
+def mark_process_dead(pid):
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR') is not None:
+        multiprocess.mark_process_dead(pid)
@@ -0,0 +1,4 @@
+from .stage_graph import Stage, StageGraph
+from .profiler import StageProfiler
+from .statistics import calculate_statistics, aggregate_player_stats
+from .match_pipeline import build_match_pipeline
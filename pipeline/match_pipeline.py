@@ -0,0 +1,245 @@
+import os
+from functools import partial
+
+import cv2
+import numpy as np
+
+from utils import read_video
+from trackers import Tracker, BallDetector, find_duplicate_frames
+from team_assigner import TeamAssigner
+from player_ball_assigner import PlayerBallAssigner
+from camera_movement_estimator import CameraMovementEstimator
+from view_transformer import ViewTransformer
+from speed_and_distance_estimator import SpeedAndDistanceEstimator
+from .stage_graph import StageGraph
+from .statistics import calculate_statistics
+from match_analytics import calculate_timeline, calculate_heatmaps
+
+
+def load_frames(video_path, video_size, video_mtime, progress_callback=None):
+    return read_video(video_path, progress_callback)
+
+
+def get_model_stamp(model_path):
+    # replacing the weights in place keeps the path, so size and mtime tell the detection stages apart
+    try:
+        model_stat = os.stat(model_path)
+    except OSError:
+        return {'model_size': None, 'model_mtime': None}
+    return {'model_size': model_stat.st_size, 'model_mtime': model_stat.st_mtime}
+
+
+def get_cache_limits():
+    max_mb = os.getenv('pipeline_cache_max_mb', '2048')
+    max_days = os.getenv('pipeline_cache_max_days', '14')
+    return {
+        'max_cache_bytes': int(float(max_mb) * 2 ** 20) if max_mb else None,
+        'max_cache_age': float(max_days) * 24 * 3600 if max_days else None,
+    }
+
+
+def detect_objects(frames, model_path, model_size, model_mtime, duplicate_threshold, detector=None,
+                   progress_callback=None):
+    if detector is None:
+        detector = Tracker(model_path)
+
+    unique_indices, source_index = find_duplicate_frames(frames, threshold=duplicate_threshold)
+    unique_detections = detector.detect_frames([frames[i] for i in unique_indices], progress_callback)
+    detections = [unique_detections[i] for i in source_index]
+    # the batch sizer belongs to whichever detector ran, local or shared, so the report travels with the result
+    batch_report = detector.batch_sizer.get_report() if detector.batch_sizer is not None else None
+    return detections, detector.get_class_names(), batch_report
+
+
+def track_objects(detection_result):
+    detections, class_names, _ = detection_result
+
+    tracker = Tracker()
+    tracks = tracker.track_detections(detections, class_names)
+    Tracker.add_position_to_tracks(tracks)
+    return tracks
+
+
+def detect_ball(frames, tracks, model_path, model_size, model_mtime, crop_size, max_misses, min_confidence,
+                detector=None, progress_callback=None):
+    if detector is None and any(1 not in ball for ball in tracks['ball']):
+        detector = Tracker(model_path)
+
+    ball_detector = BallDetector(detector, crop_size, max_misses, min_confidence)
+    return ball_detector.detect_missing(frames, tracks['ball'], progress_callback)
+
+
+def estimate_camera_movement(frames, progress_callback=None):
+    camera_movement_estimator = CameraMovementEstimator(frames[0])
+    camera_movement = camera_movement_estimator.get_camera_movement(frames, progress_callback=progress_callback)
+    report = {
+        'frames': len(frames),
+        'static_frame_ratio': camera_movement_estimator.static_frame_ratio,
+    }
+    return camera_movement, report
+
+
+def adjust_positions(tracks, camera_motion, ball_detection=None):
+    if ball_detection is not None:
+        tracks['ball'], _ = ball_detection
+    camera_movement_per_frame, _ = camera_motion
+    CameraMovementEstimator.add_adjust_positions_to_tracks(tracks, camera_movement_per_frame)
+    return tracks
+
+
+def transform_positions(tracks, pixel_vertices):
+    view_transformer = ViewTransformer(pixel_vertices)
+    view_transformer.add_transformed_position_to_tracks(tracks)
+
+    tracks['ball'] = Tracker.interpolate_ball_positions(tracks['ball'])
+    return tracks
+
+
+def estimate_speed_and_distance(tracks, frame_window, frame_rate):
+    speed_and_distance_estimator = SpeedAndDistanceEstimator(frame_window, frame_rate)
+    speed_and_distance_estimator.add_speed_and_distance_to_tracks(tracks)
+    return tracks
+
+
+def assign_teams(frames, tracks, progress_callback=None):
+    team_assigner = TeamAssigner()
+    team_assigner.assign_team_color(frames[0], tracks['players'][0])
+    for frame_num, player_track in enumerate(tracks['players']):
+        for player_id, track in player_track.items():
+            team_assigner.get_player_team(frames[frame_num], track['bbox'], player_id)
+        if progress_callback is not None:
+            progress_callback(frame_num + 1, len(tracks['players']))
+
+    return team_assigner.player_team_dict, team_assigner.team_colors
+
+
+def assign_ball_control(tracks, team_assignment, max_player_ball_distance):
+    player_team_dict, team_colors = team_assignment
+
+    for frame_num, player_track in enumerate(tracks['players']):
+        for player_id, track in player_track.items():
+            team = player_team_dict[player_id]
+            tracks['players'][frame_num][player_id]['team'] = team
+            tracks['players'][frame_num][player_id]['team_color'] = team_colors[team]
+
+    player_assigner = PlayerBallAssigner(max_player_ball_distance)
+    team_ball_control = []
+    for frame_num, player_track in enumerate(tracks['players']):
+        ball_bbox = tracks['ball'][frame_num][1]['bbox']
+        assigned_player = player_assigner.assign_ball_to_player(player_track, ball_bbox)
+        if assigned_player != -1:
+            tracks['players'][frame_num][assigned_player]['has_ball'] = True
+            team_ball_control.append(tracks['players'][frame_num][assigned_player]['team'])
+        else:
+            if len(team_ball_control) > 0:
+                team_ball_control.append(team_ball_control[-1])
+            else:
+                team_ball_control.append(0)
+
+    return tracks, np.array(team_ball_control)
+
+
+def render_annotations(frames, ball_control):
+    tracks, team_ball_control = ball_control
+
+    output_video_frames = Tracker.draw_annotations(frames, tracks, team_ball_control)
+    SpeedAndDistanceEstimator().draw_speed_and_distance(output_video_frames, tracks)
+    return output_video_frames
+
+
+def write_output_video(output_video_frames, output_path, progress_callback=None):
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+
+    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+    height, width = output_video_frames[0].shape[:2]
+    out = cv2.VideoWriter(output_path, fourcc, 30.0, (width, height))
+
+    for frame_num, frame in enumerate(output_video_frames):
+        out.write(frame)
+        if progress_callback is not None:
+            progress_callback(frame_num + 1, len(output_video_frames))
+    out.release()
+
+    return output_path
+
+
+def build_timeline(ball_control, frame_rate, window_seconds, rolling_seconds):
+    tracks, team_ball_control = ball_control
+    return calculate_timeline(tracks, team_ball_control, frame_rate, window_seconds, rolling_seconds)
+
+
+def build_heatmaps(tracks, team_assignment, pitch_size, bins, frame_rate):
+    player_team_dict, _ = team_assignment
+    return calculate_heatmaps(tracks['players'], player_team_dict, pitch_size, bins, frame_rate)
+
+
+def build_match_pipeline(video_path, output_path, model_path='models/best.pt', cache_dir='pipeline_cache',
+                         detector=None):
+    video_stat = os.stat(video_path)
+    view_transformer = ViewTransformer()
+    speed_and_distance_estimator = SpeedAndDistanceEstimator()
+    player_assigner = PlayerBallAssigner()
+
+    model_stamp = get_model_stamp(model_path)
+
+    graph = StageGraph(cache_dir, **get_cache_limits())
+    graph.add_stage(
+        'decode', load_frames,
+        params={'video_path': video_path, 'video_size': video_stat.st_size, 'video_mtime': video_stat.st_mtime},
+        persist=False, reports_progress=True
+    )
+    graph.add_stage(
+        'detect', partial(detect_objects, detector=detector), inputs=['decode'],
+        params={'model_path': model_path, **model_stamp, 'duplicate_threshold': 6},
+        reports_progress=True, version=2
+    )
+    graph.add_stage('track', track_objects, inputs=['detect'], mutates=['detect'])
+    graph.add_stage('camera_motion', estimate_camera_movement, inputs=['decode'], reports_progress=True, version=4)
+    graph.add_stage(
+        'ball', partial(detect_ball, detector=detector), inputs=['decode', 'track'],
+        params={
+            'model_path': model_path, **model_stamp, 'crop_size': 320, 'max_misses': 12, 'min_confidence': 0.3
+        },
+        reports_progress=True
+    )
+    graph.add_stage(
+        'positioning', adjust_positions, inputs=['track', 'camera_motion', 'ball'], mutates=['track', 'ball']
+    )
+    graph.add_stage(
+        'view_transform', transform_positions, inputs=['positioning'],
+        params={'pixel_vertices': view_transformer.pixel_vertices.tolist()}, mutates=['positioning']
+    )
+    graph.add_stage(
+        'speed_and_distance', estimate_speed_and_distance, inputs=['view_transform'],
+        params={
+            'frame_window': speed_and_distance_estimator.frame_window,
+            'frame_rate': speed_and_distance_estimator.frame_rate
+        },
+        mutates=['view_transform']
+    )
+    graph.add_stage('team_assignment', assign_teams, inputs=['decode', 'track'], reports_progress=True)
+    graph.add_stage(
+        'possession', assign_ball_control, inputs=['speed_and_distance', 'team_assignment'],
+        params={'max_player_ball_distance': player_assigner.max_player_ball_distance},
+        mutates=['speed_and_distance']
+    )
+    graph.add_stage('statistics', calculate_statistics, inputs=['possession'], version=2)
+    graph.add_stage(
+        'timeline', build_timeline, inputs=['possession'],
+        params={'frame_rate': speed_and_distance_estimator.frame_rate, 'window_seconds': 60, 'rolling_seconds': 10}
+    )
+    graph.add_stage(
+        'heatmaps', build_heatmaps, inputs=['view_transform', 'team_assignment'],
+        params={
+            'pitch_size': view_transformer.target_vertices.max(axis=0).tolist(),
+            'bins': (12, 34),
+            'frame_rate': speed_and_distance_estimator.frame_rate
+        }
+    )
+    graph.add_stage('render', render_annotations, inputs=['decode', 'possession'], persist=False)
+    graph.add_stage(
+        'encode', write_output_video, inputs=['render'],
+        params={'output_path': output_path}, persist=False, reports_progress=True
+    )
+
+    return graph
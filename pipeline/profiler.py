@@ -0,0 +1,152 @@
+import json
+import os
+import platform
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import psutil
+
+STAGE_WEIGHTS = {
+    'decode': 5,
+    'detect': 45,
+    'track': 4,
+    'ball': 3,
+    'camera_motion': 10,
+    'positioning': 1,
+    'view_transform': 2,
+    'speed_and_distance': 1,
+    'team_assignment': 6,
+    'possession': 2,
+    'statistics': 1,
+    'timeline': 1,
+    'heatmaps': 1,
+    'render': 12,
+    'encode': 8,
+    'database_write': 3,
+}
+
+
+def get_git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True, timeout=5
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+class StageProfiler:
+    def __init__(self, video_path, progress_callback=None, stage_callback=None, stage_weights=None,
+                 sample_interval=0.05):
+        self.video_path = video_path
+        self.progress_callback = progress_callback
+        self.stage_callback = stage_callback
+        self.stage_weights = dict(stage_weights or STAGE_WEIGHTS)
+        self.sample_interval = sample_interval
+
+        self.process = psutil.Process()
+        self.frame_count = None
+        self.started_at = datetime.now()
+        self.start_wall = time.perf_counter()
+        self.stages = []
+        self.extra = {}
+        self.running = {}
+        self.finished_weight = 0
+        self.last_percent = -1
+
+        self.peak_rss = self.process.memory_info().rss
+        self.sampling = True
+        self.sampler = threading.Thread(target=self.sample_memory, daemon=True)
+        self.sampler.start()
+
+    def sample_memory(self):
+        while self.sampling:
+            self.peak_rss = max(self.peak_rss, self.process.memory_info().rss)
+            time.sleep(self.sample_interval)
+
+    def stage_started(self, name):
+        self.peak_rss = self.process.memory_info().rss
+        self.running[name] = (time.perf_counter(), time.process_time())
+        self.report_progress(name, 0.0)
+
+    def stage_progress(self, name, done, total):
+        if total > 0:
+            self.report_progress(name, done / total)
+
+    def stage_finished(self, name):
+        wall_start, cpu_start = self.running.pop(name)
+        wall_seconds = time.perf_counter() - wall_start
+        self.peak_rss = max(self.peak_rss, self.process.memory_info().rss)
+
+        self.stages.append({
+            'name': name,
+            'wall_seconds': wall_seconds,
+            'cpu_seconds': time.process_time() - cpu_start,
+            'peak_rss_mb': self.peak_rss / 1024 ** 2,
+        })
+        self.finished_weight += self.stage_weights.get(name, 0)
+        self.report_progress(name, 0.0)
+
+        if self.stage_callback is not None:
+            self.stage_callback(name, wall_seconds)
+
+    @contextmanager
+    def measure(self, name):
+        self.stage_started(name)
+        try:
+            yield
+        finally:
+            self.stage_finished(name)
+
+    def report_progress(self, name, fraction):
+        if self.progress_callback is None:
+            return
+
+        total_weight = sum(self.stage_weights.values())
+        current_weight = self.stage_weights.get(name, 0) * fraction if name in self.running else 0
+        percent = min(99, int((self.finished_weight + current_weight) / total_weight * 100))
+        if percent > self.last_percent:
+            self.last_percent = percent
+            self.progress_callback(percent)
+
+    def finish(self):
+        self.sampling = False
+        self.sampler.join()
+        if self.progress_callback is not None:
+            self.progress_callback(100)
+
+    def get_report(self):
+        total_wall = time.perf_counter() - self.start_wall
+        for stage in self.stages:
+            if self.frame_count and stage['wall_seconds'] > 0:
+                stage['fps'] = self.frame_count / stage['wall_seconds']
+            else:
+                stage['fps'] = None
+
+        return {
+            'video_path': self.video_path,
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'git_revision': get_git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'frame_count': self.frame_count,
+            'total_wall_seconds': total_wall,
+            'total_fps': self.frame_count / total_wall if self.frame_count else None,
+            'stages': self.stages,
+            **self.extra,
+        }
+
+    def write_report(self, profile_dir='profiles'):
+        os.makedirs(profile_dir, exist_ok=True)
+        base_name = os.path.splitext(os.path.basename(self.video_path))[0]
+        # jobs for the same video can start within the same second, so the pid keeps their reports apart
+        profile_path = os.path.join(
+            profile_dir, f'{base_name}-{self.started_at.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}.json'
+        )
+        with open(profile_path, 'w') as f:
+            json.dump(self.get_report(), f, indent=2)
+        return profile_path
@@ -0,0 +1,176 @@
+import copy
+import hashlib
+import os
+import pickle
+import time
+
+MISSING = object()
+
+
+class Stage:
+    def __init__(self, name, func, inputs=(), params=None, mutates=(), persist=True, reports_progress=False,
+                 version=None):
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.params = dict(params or {})
+        self.mutates = tuple(mutates)
+        self.persist = persist
+        self.reports_progress = reports_progress
+        self.version = version
+
+
+class StageGraph:
+    def __init__(self, cache_dir=None, max_cache_bytes=None, max_cache_age=None):
+        self.stages = {}
+        self.results = {}
+        self.cache_dir = cache_dir
+        self.max_cache_bytes = max_cache_bytes
+        self.max_cache_age = max_cache_age
+        self.computed_stages = []
+        self.listeners = []
+
+    def add_stage(self, name, func, inputs=(), params=None, mutates=(), persist=True, reports_progress=False,
+                  version=None):
+        if name in self.stages:
+            raise ValueError(f'Stage already exists: {name}')
+        for input_name in inputs:
+            if input_name not in self.stages:
+                raise ValueError(f'Unknown input stage for {name}: {input_name}')
+        for input_name in mutates:
+            if input_name not in inputs:
+                raise ValueError(f'Stage {name} mutates {input_name}, which is not one of its inputs')
+
+        stage = Stage(name, func, inputs, params, mutates, persist, reports_progress, version)
+        self.stages[name] = stage
+        return stage
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def set_params(self, name, **params):
+        self.stages[name].params.update(params)
+
+    def get_stage_key(self, name, keys=None):
+        if keys is None:
+            keys = {}
+        if name in keys:
+            return keys[name]
+
+        stage = self.stages[name]
+        hasher = hashlib.sha1(name.encode())
+        hasher.update(pickle.dumps(sorted(stage.params.items()), protocol=4))
+        # bumping a stage's version invalidates its cached results after its output changes
+        if stage.version is not None:
+            hasher.update(f'version={stage.version}'.encode())
+        for input_name in stage.inputs:
+            hasher.update(self.get_stage_key(input_name, keys).encode())
+
+        keys[name] = hasher.hexdigest()
+        return keys[name]
+
+    def run(self, name):
+        computed_count = len(self.computed_stages)
+        result = self.run_stage(name, {})
+        if len(self.computed_stages) > computed_count:
+            self.prune_cache()
+        return result
+
+    def run_stage(self, name, keys):
+        key = self.get_stage_key(name, keys)
+
+        if name in self.results and self.results[name][0] == key:
+            return self.results[name][1]
+
+        stage = self.stages[name]
+        cache_path = self.get_cache_path(stage, key)
+        result = self.load_cached(cache_path)
+        if result is MISSING:
+            inputs = []
+            for input_name in stage.inputs:
+                input_value = self.run_stage(input_name, keys)
+                if input_name in stage.mutates:
+                    input_value = copy.deepcopy(input_value)
+                inputs.append(input_value)
+
+            kwargs = dict(stage.params)
+            if stage.reports_progress:
+                kwargs['progress_callback'] = lambda done, total: self.notify('stage_progress', name, done, total)
+
+            self.notify('stage_started', name)
+            result = stage.func(*inputs, **kwargs)
+            self.computed_stages.append(name)
+            self.notify('stage_finished', name)
+
+            if cache_path is not None:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                with open(cache_path + '.tmp', 'wb') as f:
+                    pickle.dump(result, f)
+                os.replace(cache_path + '.tmp', cache_path)
+
+        self.results[name] = (key, result)
+        return result
+
+    def notify(self, event, *args):
+        for listener in self.listeners:
+            getattr(listener, event)(*args)
+
+    def get_cache_path(self, stage, key):
+        if self.cache_dir is None or not stage.persist:
+            return None
+        return os.path.join(self.cache_dir, f'{stage.name}-{key}.pkl')
+
+    @staticmethod
+    def load_cached(cache_path):
+        if cache_path is None:
+            return MISSING
+        try:
+            with open(cache_path, 'rb') as f:
+                result = pickle.load(f)
+        except FileNotFoundError:
+            # missing, or pruned by another worker since the key was computed
+            return MISSING
+
+        # pruning goes by modification time, so a hit keeps the entry as recent as a fresh one
+        try:
+            os.utime(cache_path)
+        except FileNotFoundError:
+            pass
+        return result
+
+    def prune_cache(self):
+        if self.cache_dir is None or (self.max_cache_bytes is None and self.max_cache_age is None):
+            return
+        if not os.path.isdir(self.cache_dir):
+            return
+
+        # results held by this graph stay, dropping them would only force a recompute on the next run
+        in_use = {self.get_cache_path(self.stages[name], key) for name, (key, _) in self.results.items()}
+        total_bytes = 0
+        candidates = []
+        for entry in os.scandir(self.cache_dir):
+            if not entry.name.endswith('.pkl'):
+                continue
+            try:
+                entry_stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            total_bytes += entry_stat.st_size
+            if entry.path not in in_use:
+                candidates.append((entry_stat.st_mtime, entry_stat.st_size, entry.path))
+
+        now = time.time()
+        for mtime, size, path in sorted(candidates):
+            expired = self.max_cache_age is not None and now - mtime > self.max_cache_age
+            oversized = self.max_cache_bytes is not None and total_bytes > self.max_cache_bytes
+            if not expired and not oversized:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total_bytes -= size
+
+    def clear(self):
+        self.results = {}
+        self.computed_stages = []
@@ -0,0 +1,50 @@
+def aggregate_player_stats(tracks):
+    # a single pass over the track dicts: flattening them into columns for grouped reductions costs as much
+    # as this pass, and a match has too few track ids for the reductions to win that back
+    speeds = {}
+    last_distances = {}
+    last_tracks = {}
+    for frame in tracks['players']:
+        for player_id, track in frame.items():
+            if 'speed' in track:
+                speeds.setdefault(player_id, []).append(track['speed'])
+            if 'distance' in track:
+                last_distances[player_id] = track['distance']
+            last_tracks[player_id] = track
+
+    players = {}
+    for player_id in sorted(last_tracks):
+        last_track = last_tracks[player_id]
+        if 'team' not in last_track:
+            continue
+
+        player_speeds = speeds.get(player_id)
+        players[int(player_id)] = {
+            'avg_speed': float(sum(player_speeds) / len(player_speeds)) if player_speeds else 0.0,
+            'max_speed': float(max(player_speeds)) if player_speeds else 0.0,
+            'total_distance': float(last_distances.get(player_id, 0)),
+            'team': last_track['team'],
+            'team_color': last_track.get('team_color', (0, 0, 0))
+        }
+
+    return players
+
+
+def calculate_statistics(ball_control):
+    tracks, team_ball_control = ball_control
+
+    total_frames = len(team_ball_control)
+    if total_frames > 0:
+        team1_percentage = (team_ball_control == 1).sum() / total_frames * 100
+        team2_percentage = (team_ball_control == 2).sum() / total_frames * 100
+    else:
+        team1_percentage = 0
+        team2_percentage = 0
+
+    return {
+        'team_possession': {
+            'team1': team1_percentage,
+            'team2': team2_percentage
+        },
+        'players': aggregate_player_stats(tracks)
+    }
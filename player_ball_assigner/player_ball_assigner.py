@@ -4,8 +4,8 @@ sys.path.append('../')
 
 
 class PlayerBallAssigner:
-    def __init__(self):
-        self.max_player_ball_distance = 70
+    def __init__(self, max_player_ball_distance=70):
+        self.max_player_ball_distance = max_player_ball_distance
 
     def assign_ball_to_player(self, players, ball_bbox):
         ball_position = get_center_of_bbox(ball_bbox)
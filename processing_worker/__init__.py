@@ -0,0 +1 @@
+from .processing_worker import ProcessingJob, process_video
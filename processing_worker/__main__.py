@@ -0,0 +1,52 @@
+import argparse
+
+from database_utils import ensure_schema
+from detector_service import DetectorService
+from metrics import QUEUE_DEPTH, start_metrics_server
+from .processing_worker import ProcessingJob
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Process match videos one after another without the GUI. '
+                    'Set metrics_port to serve Prometheus metrics while the batch runs.'
+    )
+    parser.add_argument('videos', nargs='+')
+    args = parser.parse_args()
+
+    ensure_schema()
+    port = start_metrics_server()
+    if port is not None:
+        print(f'Serving metrics on port {port}')
+
+    detector_service = DetectorService()
+    failed = 0
+    for i, video_path in enumerate(args.videos):
+        QUEUE_DEPTH.labels('jobs').set(len(args.videos) - i - 1)
+        job = ProcessingJob(video_path, detector_service)
+        job.start()
+        try:
+            while True:
+                event = job.get_event()
+                if event is None or event[0] in ('progress', 'stage'):
+                    continue
+                if event[0] == 'profile':
+                    print(f'{video_path}: profile written to {event[1]}')
+                elif event[0] == 'finished':
+                    print(f'{video_path}: saved as match {event[2]}')
+                    break
+                elif event[0] == 'error':
+                    print(f'{video_path}: {event[1]}')
+                    failed += 1
+                    break
+        finally:
+            job.close()
+
+    QUEUE_DEPTH.labels('jobs').set(0)
+    detector_service.stop()
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
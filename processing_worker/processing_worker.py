@@ -0,0 +1,143 @@
+import multiprocessing
+import os
+import queue
+import traceback
+
+from metrics import mark_process_dead
+
+
+def get_detector_report(detector):
+    info = detector.get_info()
+    cold_start_seconds = info['load_seconds'] + info['warmup_seconds']
+    return {
+        'pid': info['pid'],
+        'cold_start_seconds': cold_start_seconds,
+        'jobs_served': info['clients'],
+        'frames_served': info['frames'],
+        'cold_start_seconds_per_job': cold_start_seconds / max(info['clients'], 1),
+    }
+
+
+def process_video(video_path, events, detector_address=None, detector_authkey=None):
+    from metrics import FRAMES_PROCESSED, JOBS, ACTIVE_JOBS, STAGE_SECONDS, DATABASE_WRITE_SECONDS, QUEUE_DEPTH
+
+    def emit(event):
+        events.put(event)
+        try:
+            QUEUE_DEPTH.labels('events').set(events.qsize())
+        except NotImplementedError:
+            pass
+
+    def stage_finished(name, elapsed):
+        STAGE_SECONDS.labels(name).observe(elapsed)
+        emit(('stage', name, elapsed))
+
+    ACTIVE_JOBS.inc()
+    detector = None
+    try:
+        from pipeline import build_match_pipeline, StageProfiler
+        from detector_service import DetectorClient
+        from trackers import get_duplicate_frame_report
+        from match_analytics import pack_arrays
+        from video_storage import get_video_storage
+        from database_utils import save_match_results
+
+        filename = os.path.basename(video_path)
+        base_name, ext = os.path.splitext(filename)
+        output_path = os.path.join('output_videos', f'processed_{base_name}.mp4')
+
+        profiler = StageProfiler(
+            video_path,
+            progress_callback=lambda percent: emit(('progress', percent)),
+            stage_callback=stage_finished
+        )
+        if detector_address is not None:
+            try:
+                detector = DetectorClient(detector_address, detector_authkey)
+            except (OSError, EOFError) as e:
+                # the service can die after handing out its address, the stages then load the model themselves
+                print(f'Помилка підключення до сервісу детектора, модель завантажується локально: {e}')
+                detector = None
+        pipeline = build_match_pipeline(video_path, output_path, detector=detector)
+        pipeline.add_listener(profiler)
+
+        profiler.frame_count = len(pipeline.run('decode'))
+        stats = pipeline.run('statistics')
+        analytics = {kind: pipeline.run(kind) for kind in ('timeline', 'heatmaps')}
+        pipeline.run('encode')
+
+        with profiler.measure('database_write'), DATABASE_WRITE_SECONDS.time():
+            video_ref = get_video_storage().put_file(output_path, move=True)
+            match_id = save_match_results(
+                video_ref, os.path.basename(output_path), stats,
+                analytics={kind: pack_arrays(arrays) for kind, arrays in analytics.items()}
+            )
+
+        profiler.finish()
+        profiler.extra['cached_stages'] = [name for name in pipeline.stages if name not in pipeline.computed_stages]
+        if 'detect' in pipeline.results:
+            detections, _, batch_report = pipeline.results['detect'][1]
+            profiler.extra['duplicate_frames'] = get_duplicate_frame_report(detections)
+            if batch_report is not None:
+                profiler.extra['detector_batches'] = batch_report
+        if 'camera_motion' in pipeline.results:
+            _, profiler.extra['camera_motion'] = pipeline.results['camera_motion'][1]
+        if 'ball' in pipeline.results:
+            _, profiler.extra['ball_detection'] = pipeline.results['ball'][1]
+        if detector is not None:
+            profiler.extra['detector_service'] = get_detector_report(detector)
+        emit(('profile', profiler.write_report()))
+
+        FRAMES_PROCESSED.inc(profiler.frame_count)
+        JOBS.labels('finished').inc()
+        emit(('finished', output_path, match_id, dict(stats, analytics=analytics)))
+    except Exception as e:
+        traceback.print_exc()
+        JOBS.labels('failed').inc()
+        emit(('error', str(e)))
+    finally:
+        if detector is not None:
+            detector.close()
+        ACTIVE_JOBS.dec()
+
+
+class ProcessingJob:
+    def __init__(self, video_path, detector_service=None):
+        self.video_path = video_path
+        self.detector_service = detector_service
+        self.context = multiprocessing.get_context('spawn')
+        self.events = self.context.Queue()
+        self.process = None
+
+    def start(self):
+        detector_address, detector_authkey = None, None
+        if self.detector_service is not None:
+            detector_address = self.detector_service.get_address()
+            detector_authkey = self.detector_service.authkey
+
+        self.process = self.context.Process(
+            target=process_video, args=(self.video_path, self.events, detector_address, detector_authkey), daemon=True
+        )
+        self.process.start()
+
+    def get_event(self, timeout=0.2):
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            if self.process is not None and not self.process.is_alive():
+                try:
+                    return self.events.get_nowait()
+                except queue.Empty:
+                    return 'error', f'Процес обробки завершився з кодом {self.process.exitcode}'
+            return None
+
+    def cancel(self):
+        if self.process is not None and self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+
+    def close(self):
+        if self.process is not None:
+            self.process.join(timeout=1)
+            mark_process_dead(self.process.pid)
+        self.events.close()
@@ -6,9 +6,9 @@ sys.path.append('../')
 
 
 class SpeedAndDistanceEstimator:
-    def __init__(self):
-        self.frame_window = 5
-        self.frame_rate = 24
+    def __init__(self, frame_window=5, frame_rate=24):
+        self.frame_window = frame_window
+        self.frame_rate = frame_rate
 
     def add_speed_and_distance_to_tracks(self, tracks):
         total_distance = {}
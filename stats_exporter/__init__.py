@@ -0,0 +1 @@
+from .stats_exporter import StatsExporter, EXPORT_QUERIES
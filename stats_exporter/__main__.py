@@ -0,0 +1,21 @@
+import argparse
+import time
+
+from .stats_exporter import StatsExporter, EXPORT_QUERIES
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stream a statistics table to CSV or Parquet')
+    parser.add_argument('table', choices=sorted(EXPORT_QUERIES))
+    parser.add_argument('output_path')
+    parser.add_argument('--format', choices=['csv', 'parquet'], default=None)
+    parser.add_argument('--fetch-size', type=int, default=10000)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    row_count = StatsExporter(args.fetch_size).export(args.table, args.output_path, args.format)
+    print(f'Exported {row_count} rows to {args.output_path} in {time.perf_counter() - start:.2f} s')
+
+
+if __name__ == '__main__':
+    main()
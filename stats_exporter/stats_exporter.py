@@ -0,0 +1,83 @@
+import csv
+import os
+
+from database_utils import stream_rows
+
+EXPORT_QUERIES = {
+    'playerstats': "SELECT player_id, team_id, match_id, distance, avg_speed FROM playerstats",
+    'teamstats': "SELECT team_id, match_id, ball_possession FROM teamstats",
+}
+
+
+class CsvBatchWriter:
+    def __init__(self, output_path):
+        self.file = open(output_path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        self.header_written = False
+
+    def write_batch(self, columns, rows):
+        if not self.header_written:
+            self.writer.writerow(columns)
+            self.header_written = True
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetBatchWriter:
+    def __init__(self, output_path):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as e:
+            raise ImportError('Parquet export requires pyarrow: pip install pyarrow') from e
+
+        self.pyarrow = pyarrow
+        self.parquet = pyarrow.parquet
+        self.output_path = output_path
+        self.writer = None
+
+    def write_batch(self, columns, rows):
+        data = {column: [row[i] for row in rows] for i, column in enumerate(columns)}
+        if self.writer is None:
+            table = self.pyarrow.table(data)
+            self.writer = self.parquet.ParquetWriter(self.output_path, table.schema)
+        else:
+            table = self.pyarrow.table(data, schema=self.writer.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+class StatsExporter:
+    def __init__(self, fetch_size=10000):
+        self.fetch_size = fetch_size
+
+    @staticmethod
+    def get_writer(output_path, output_format=None):
+        if output_format is None:
+            output_format = os.path.splitext(output_path)[1].lstrip('.').lower()
+
+        if output_format == 'csv':
+            return CsvBatchWriter(output_path)
+        if output_format == 'parquet':
+            return ParquetBatchWriter(output_path)
+        raise ValueError(f'Unsupported export format: {output_format}')
+
+    def export(self, table, output_path, output_format=None):
+        if table not in EXPORT_QUERIES:
+            raise ValueError(f'Unknown table: {table}. Available: {", ".join(EXPORT_QUERIES)}')
+
+        writer = self.get_writer(output_path, output_format)
+        row_count = 0
+        try:
+            for columns, rows in stream_rows(EXPORT_QUERIES[table], fetch_size=self.fetch_size):
+                writer.write_batch(columns, rows)
+                row_count += len(rows)
+        finally:
+            writer.close()
+
+        return row_count
@@ -1,6 +1,3 @@
-from sklearn.cluster import KMeans
-
-
 class TeamAssigner:
     def __init__(self):
         self.kmeans = None
@@ -9,6 +6,8 @@ class TeamAssigner:
 
     @staticmethod
     def get_clustering_model(image):
+        from sklearn.cluster import KMeans
+
         image_2d = image.reshape(-1, 3)
 
         kmeans = KMeans(n_clusters=2, init='k-means++', n_init=1)
@@ -38,6 +37,8 @@ class TeamAssigner:
         return player_color
 
     def assign_team_color(self, frame, player_detections):
+        from sklearn.cluster import KMeans
+
         player_colors = []
         for _, player_detection in player_detections.items():
             bbox = player_detection['bbox']
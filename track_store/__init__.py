@@ -0,0 +1,9 @@
+from .track_store import (
+    SCHEMA_VERSION,
+    TrackStore,
+    save_tracks,
+    load_tracks,
+    save_camera_movement,
+    load_camera_movement,
+    convert_stub,
+)
@@ -0,0 +1,31 @@
+import argparse
+import sys
+
+from .track_store import convert_stub, verify_stub
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert pickled track and camera movement stubs to the columnar format')
+    parser.add_argument('command', choices=['convert', 'verify'])
+    parser.add_argument('stubs', nargs='+', help='pickled stubs, e.g. stubs/*.pkl')
+    args = parser.parse_args()
+
+    failed = False
+    for stub_path in args.stubs:
+        if args.command == 'convert':
+            print(f'{stub_path} -> {convert_stub(stub_path)}')
+            continue
+
+        # slices of the columnar store have to read like the same slices of the pickled lists
+        mismatches = verify_stub(stub_path)
+        print(f'{stub_path}: {"OK" if not mismatches else f"{len(mismatches)} mismatched slices"}')
+        for name, start, stop in mismatches:
+            print(f'    {name}[{start}:{stop}]')
+        failed = failed or bool(mismatches)
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+import json
+import os
+import pickle
+import shutil
+import uuid
+
+import numpy as np
+
+SCHEMA_VERSION = 1
+TRACK_OBJECTS = ('players', 'referees', 'ball')
+# slices at the edges of the frame offsets, including the empty and out-of-range ones list slicing allows
+VERIFY_SLICES = ((0, None), (0, 1), (5, 2), (3, 3), (-2, None), (0, -1), (10 ** 9, None))
+
+
+def write_store(path, kind, meta, arrays):
+    temp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+    os.makedirs(temp_path)
+    for name, array in arrays.items():
+        np.save(os.path.join(temp_path, f'{name}.npy'), array, allow_pickle=False)
+    with open(os.path.join(temp_path, 'meta.json'), 'w') as f:
+        json.dump({'schema_version': SCHEMA_VERSION, 'kind': kind, **meta}, f, indent=2)
+
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    os.replace(temp_path, path)
+    return path
+
+
+def read_meta(path, kind):
+    with open(os.path.join(path, 'meta.json')) as f:
+        meta = json.load(f)
+    if meta.get('kind') != kind:
+        raise ValueError(f'{path} holds {meta.get("kind")}, not {kind}')
+    if meta.get('schema_version') != SCHEMA_VERSION:
+        raise ValueError(f'Unsupported schema version {meta.get("schema_version")} in {path}')
+    return meta
+
+
+def load_array(path, name, mmap):
+    return np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r' if mmap else None, allow_pickle=False)
+
+
+def save_tracks(tracks, path):
+    frame_count = len(tracks['players'])
+    arrays = {}
+    for object in TRACK_OBJECTS:
+        frame_offsets = np.zeros(frame_count + 1, dtype=np.int64)
+        track_ids = []
+        bboxes = []
+        for frame_num, track in enumerate(tracks[object]):
+            for track_id, track_info in track.items():
+                track_ids.append(track_id)
+                bboxes.append(track_info['bbox'])
+            frame_offsets[frame_num + 1] = len(track_ids)
+
+        arrays[f'{object}_frame_offsets'] = frame_offsets
+        arrays[f'{object}_track_id'] = np.array(track_ids, dtype=np.int64)
+        arrays[f'{object}_bbox'] = np.array(bboxes, dtype=np.float64).reshape(-1, 4)
+
+    return write_store(path, 'tracks', {'frame_count': frame_count, 'objects': list(TRACK_OBJECTS)}, arrays)
+
+
+class TrackStore:
+    def __init__(self, path, mmap=True):
+        self.path = path
+        self.meta = read_meta(path, 'tracks')
+        self.frame_count = self.meta['frame_count']
+        self.arrays = {
+            object: {
+                field: load_array(path, f'{object}_{field}', mmap)
+                for field in ('frame_offsets', 'track_id', 'bbox')
+            }
+            for object in self.meta['objects']
+        }
+
+    def __len__(self):
+        return self.frame_count
+
+    def get_object_arrays(self, object, start=0, stop=None):
+        start, stop, _ = slice(start, stop).indices(self.frame_count)
+        # an empty slice still needs one offset, so it reads as zero frames like an empty list slice
+        stop = max(start, stop)
+        arrays = self.arrays[object]
+        frame_offsets = arrays['frame_offsets'][start:stop + 1]
+        rows = slice(int(frame_offsets[0]), int(frame_offsets[-1]))
+        return frame_offsets - frame_offsets[0], arrays['track_id'][rows], arrays['bbox'][rows]
+
+    def read(self, start=0, stop=None):
+        tracks = {}
+        for object in self.arrays:
+            frame_offsets, track_ids, bboxes = self.get_object_arrays(object, start, stop)
+            track_ids = track_ids.tolist()
+            bboxes = bboxes.tolist()
+            tracks[object] = [
+                {track_ids[row]: {'bbox': bboxes[row]} for row in range(frame_offsets[i], frame_offsets[i + 1])}
+                for i in range(len(frame_offsets) - 1)
+            ]
+        return tracks
+
+
+def load_tracks(path, start=0, stop=None, mmap=True):
+    return TrackStore(path, mmap).read(start, stop)
+
+
+def save_camera_movement(camera_movement, path):
+    camera_movement = np.array(camera_movement, dtype=np.float64).reshape(-1, 2)
+    return write_store(path, 'camera_movement', {'frame_count': len(camera_movement)},
+                       {'camera_movement': camera_movement})
+
+
+def load_camera_movement(path, start=0, stop=None, mmap=True):
+    read_meta(path, 'camera_movement')
+    return load_array(path, 'camera_movement', mmap)[start:stop].tolist()
+
+
+def frames_match(expected_frames, frames):
+    if len(expected_frames) != len(frames):
+        return False
+    for expected, frame in zip(expected_frames, frames):
+        if expected.keys() != frame.keys():
+            return False
+        if not all(np.allclose(expected[track_id]['bbox'], frame[track_id]['bbox']) for track_id in expected):
+            return False
+    return True
+
+
+def verify_stub(pickle_path, store_path=None):
+    with open(pickle_path, 'rb') as f:
+        stub = pickle.load(f)
+
+    base_path = os.path.splitext(pickle_path)[0]
+    mismatches = []
+    if isinstance(stub, dict):
+        store = TrackStore(store_path or f'{base_path}.tracks')
+        for start, stop in VERIFY_SLICES:
+            tracks = store.read(start, stop)
+            for object in TRACK_OBJECTS:
+                if not frames_match(stub[object][start:stop], tracks[object]):
+                    mismatches.append((object, start, stop))
+    else:
+        store_path = store_path or f'{base_path}.camera'
+        for start, stop in VERIFY_SLICES:
+            expected = np.array(stub[start:stop], dtype=np.float64).reshape(-1, 2)
+            camera_movement = np.array(load_camera_movement(store_path, start, stop)).reshape(-1, 2)
+            if expected.shape != camera_movement.shape or not np.allclose(expected, camera_movement):
+                mismatches.append(('camera_movement', start, stop))
+    return mismatches
+
+
+def convert_stub(pickle_path, output_path=None):
+    with open(pickle_path, 'rb') as f:
+        stub = pickle.load(f)
+
+    base_path = os.path.splitext(pickle_path)[0]
+    if isinstance(stub, dict):
+        return save_tracks(stub, output_path or f'{base_path}.tracks')
+    return save_camera_movement(stub, output_path or f'{base_path}.camera')
@@ -1 +1,4 @@
 from .tracker import Tracker
+from .ball_detector import BallDetector
+from .duplicate_frames import find_duplicate_frames, get_duplicate_frame_report
+from .batch_sizer import BatchSizer, detect_in_batches
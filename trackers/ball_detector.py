@@ -0,0 +1,126 @@
+import time
+
+import numpy as np
+from utils import get_center_of_bbox
+
+
+class BallSearch:
+    def __init__(self, frame_num, history):
+        self.frame_num = frame_num
+        self.history = history
+        self.misses = 0
+
+    def predict_position(self):
+        last_frame, last_position = self.history[-1]
+        if len(self.history) < 2:
+            return last_position
+
+        previous_frame, previous_position = self.history[-2]
+        velocity = (last_position - previous_position) / (last_frame - previous_frame)
+        return last_position + velocity * (self.frame_num - last_frame)
+
+
+class BallDetector:
+    def __init__(self, detector, crop_size=320, max_misses=12, min_confidence=0.3):
+        self.detector = detector
+        self.crop_size = crop_size
+        self.max_misses = max_misses
+        # a crop has no surrounding play to rule out a bright sock or pitch marking, so it needs a surer hit
+        self.min_confidence = min_confidence
+
+    def get_crop_box(self, position, frame_shape):
+        height, width = frame_shape[:2]
+        crop_size = min(self.crop_size, width, height)
+        x1 = int(np.clip(position[0] - crop_size / 2, 0, width - crop_size))
+        y1 = int(np.clip(position[1] - crop_size / 2, 0, height - crop_size))
+        return x1, y1, x1 + crop_size, y1 + crop_size
+
+    @staticmethod
+    def is_inside(position, frame_shape):
+        height, width = frame_shape[:2]
+        return 0 <= position[0] < width and 0 <= position[1] < height
+
+    def get_ball_bbox(self, detection, ball_class_id, crop_box):
+        is_ball = (detection.class_id == ball_class_id) & (detection.confidence >= self.min_confidence)
+        if not is_ball.any():
+            return None
+
+        best = np.argmax(detection.confidence[is_ball])
+        x1, y1, _, _ = crop_box
+        return (detection.xyxy[is_ball][best] + [x1, y1, x1, y1]).tolist()
+
+    def start_searches(self, ball_tracks):
+        searches = []
+        history = []
+        for frame_num, ball in enumerate(ball_tracks):
+            if 1 in ball:
+                history = history[-1:] + [(frame_num, np.array(get_center_of_bbox(ball[1]['bbox']), dtype=float))]
+            elif history and frame_num > 0 and 1 in ball_tracks[frame_num - 1]:
+                searches.append(BallSearch(frame_num, list(history)))
+        return searches
+
+    def detect_missing(self, frames, ball_tracks, progress_callback=None):
+        ball_tracks = [dict(ball) for ball in ball_tracks]
+        full_frame_ball_frames = sum(1 for ball in ball_tracks if 1 in ball)
+        missing_frames = len(ball_tracks) - full_frame_ball_frames
+
+        searches = self.start_searches(ball_tracks)
+        ball_class_id = None
+        if searches:
+            ball_class_id = {name: class_id for class_id, name in self.detector.get_class_names().items()}['ball']
+
+        crop_count = 0
+        roi_seconds = 0
+        searched_frames = 0
+        # every search moves one frame per round, so one detector call covers the next frame of all open gaps
+        while searches:
+            crop_boxes = []
+            active_searches = []
+            for search in searches:
+                position = search.predict_position()
+                if self.is_inside(position, frames[search.frame_num].shape):
+                    crop_boxes.append(self.get_crop_box(position, frames[search.frame_num].shape))
+                    active_searches.append(search)
+
+            crops = [frames[search.frame_num][y1:y2, x1:x2] for search, (x1, y1, x2, y2) in
+                     zip(active_searches, crop_boxes)]
+            start = time.perf_counter()
+            detections = self.detector.detect_frames(crops, batch_size=len(crops)) if crops else []
+            roi_seconds += time.perf_counter() - start
+            crop_count += len(crops)
+
+            searches = []
+            for search, crop_box, detection in zip(active_searches, crop_boxes, detections):
+                bbox = self.get_ball_bbox(detection, ball_class_id, crop_box)
+                if bbox is not None:
+                    ball_tracks[search.frame_num] = {1: {'bbox': bbox, 'position': get_center_of_bbox(bbox)}}
+                    search.history = search.history[-1:] + [
+                        (search.frame_num, np.array(get_center_of_bbox(bbox), dtype=float))
+                    ]
+                    search.misses = 0
+                else:
+                    search.misses += 1
+
+                searched_frames += 1
+                search.frame_num += 1
+                if (search.misses < self.max_misses and search.frame_num < len(ball_tracks)
+                        and 1 not in ball_tracks[search.frame_num]):
+                    searches.append(search)
+
+            if progress_callback is not None:
+                progress_callback(searched_frames, max(missing_frames, 1))
+
+        frame_count = max(len(ball_tracks), 1)
+        ball_frames = sum(1 for ball in ball_tracks if 1 in ball)
+        # share of frames with a ball box, there is no ground truth here to measure recall against
+        report = {
+            'frames': len(ball_tracks),
+            'full_frame_ball_frames': full_frame_ball_frames,
+            'roi_ball_frames': ball_frames - full_frame_ball_frames,
+            'ball_coverage_full_frame': full_frame_ball_frames / frame_count,
+            'ball_coverage': ball_frames / frame_count,
+            'crops': crop_count,
+            'crops_per_frame': crop_count / frame_count,
+            'roi_seconds_per_frame': roi_seconds / frame_count,
+        }
+        return ball_tracks, report
@@ -0,0 +1,107 @@
+import os
+import time
+
+import psutil
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# letterboxed float32 input plus activations of one image at 640x640, refined by the memory probe
+INFERENCE_BYTES_PER_FRAME = 48 * 2 ** 20
+
+
+def get_memory_usage():
+    return psutil.Process().memory_info().rss
+
+
+def measure_memory_growth(detect_batch):
+    def detect(frames):
+        memory_before = get_memory_usage()
+        detections = detect_batch(frames)
+        return detections, get_memory_usage() - memory_before
+    return detect
+
+
+def get_memory_budget():
+    budget_mb = os.getenv('detector_memory_budget_mb')
+    if budget_mb:
+        return int(float(budget_mb) * 2 ** 20)
+    return psutil.virtual_memory().available // 4
+
+
+class BatchSizer:
+    def __init__(self, memory_budget=None, min_batch_size=1, max_batch_size=64, improvement=1.05):
+        self.memory_budget = memory_budget if memory_budget is not None else get_memory_budget()
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size
+        self.improvement = improvement
+
+        self.bytes_per_frame = None
+        self.batch_size = None
+        self.probing = True
+        self.probes = []
+        self.frames = 0
+        self.seconds = 0
+
+    def get_memory_limit(self):
+        return max(self.min_batch_size, min(self.max_batch_size, int(self.memory_budget // self.bytes_per_frame)))
+
+    def next_batch_size(self, frame):
+        if self.batch_size is None:
+            self.bytes_per_frame = frame.nbytes + INFERENCE_BYTES_PER_FRAME
+            initial_batch_size = max(self.min_batch_size, (os.cpu_count() or 1) // 2)
+            self.batch_size = min(initial_batch_size, self.get_memory_limit())
+        return self.batch_size
+
+    def record(self, batch_size, seconds, memory_growth=None):
+        self.frames += batch_size
+        self.seconds += seconds
+        # a short final batch says nothing about the planned size
+        if not self.probing or batch_size != self.batch_size:
+            return
+
+        # memory the detector still holds after a batch grows with its size, so it bounds the per-frame cost
+        if memory_growth is not None and memory_growth > 0:
+            self.bytes_per_frame = max(self.bytes_per_frame, memory_growth / batch_size)
+
+        fps = batch_size / max(seconds, 1e-9)
+        self.probes.append({'batch_size': batch_size, 'fps': fps})
+
+        best = max(self.probes, key=lambda probe: probe['fps'])
+        memory_limit = self.get_memory_limit()
+        if len(self.probes) > 1 and fps < self.probes[-2]['fps'] * self.improvement:
+            self.batch_size = min(best['batch_size'], memory_limit)
+            self.probing = False
+        elif min(batch_size * 2, memory_limit) <= batch_size:
+            self.batch_size = min(batch_size, memory_limit)
+            self.probing = False
+        else:
+            self.batch_size = min(batch_size * 2, memory_limit)
+
+    def get_report(self):
+        return {
+            'memory_budget_mb': self.memory_budget / 2 ** 20,
+            'bytes_per_frame_mb': (self.bytes_per_frame or 0) / 2 ** 20,
+            'probes': self.probes,
+            'batch_size': self.batch_size,
+            'fps': self.frames / self.seconds if self.seconds else 0,
+        }
+
+
+def detect_in_batches(frames, detect_batch, batch_sizer, progress_callback=None):
+    # detect_batch returns the detections together with the memory growth of the process running the model
+    detections = []
+    i = 0
+    while i < len(frames):
+        batch_size = batch_sizer.next_batch_size(frames[i])
+        batch = frames[i:i + batch_size]
+
+        start = time.perf_counter()
+        batch_detections, memory_growth = detect_batch(batch)
+        batch_sizer.record(len(batch), time.perf_counter() - start, memory_growth)
+        detections += batch_detections
+
+        i += len(batch)
+        if progress_callback is not None:
+            progress_callback(i, len(frames))
+    return detections
@@ -0,0 +1,34 @@
+import cv2
+import numpy as np
+
+
+def get_frame_thumbnail(frame, size):
+    thumbnail = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(thumbnail, cv2.COLOR_BGR2GRAY).astype(np.int16)
+
+
+def find_duplicate_frames(frames, size=(96, 54), threshold=6):
+    # each thumbnail pixel averages a 20x20 block, which smooths out encoder noise on a frozen frame
+    # while a player moving a few pixels still shifts its block by more than the threshold
+    unique_indices = []
+    source_index = []
+    last_thumbnail = None
+    for frame_num, frame in enumerate(frames):
+        thumbnail = get_frame_thumbnail(frame, size)
+        if last_thumbnail is None or np.abs(thumbnail - last_thumbnail).max() >= threshold:
+            unique_indices.append(frame_num)
+            last_thumbnail = thumbnail
+        source_index.append(len(unique_indices) - 1)
+
+    return unique_indices, source_index
+
+
+def get_duplicate_frame_report(detections):
+    frame_count = len(detections)
+    reused_frames = sum(1 for previous, current in zip(detections, detections[1:]) if current is previous)
+    return {
+        'frames': frame_count,
+        'inferred_frames': frame_count - reused_frames,
+        'reused_frames': reused_frames,
+        'inference_saved': reused_frames / max(frame_count, 1),
+    }
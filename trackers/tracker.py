@@ -1,22 +1,33 @@
+import copy
 import os
 
 import numpy as np
-import pandas as pd
-from ultralytics import YOLO
 from utils import get_center_of_bbox, get_bbox_width, get_foot_position
-import supervision as sv
 import pickle
+from metrics import DETECTOR_BATCH_SECONDS, DETECTOR_FRAMES
+from track_store import load_tracks, save_tracks
+from .batch_sizer import BatchSizer, detect_in_batches, measure_memory_growth
 import cv2
 import sys
 sys.path.append('../')
 
 
 class Tracker:
-    def __init__(self, model_path):
-        self.model = YOLO(model_path)
-        self.tracker = sv.ByteTrack()
+    def __init__(self, model_path=None):
+        # ultralytics pulls in torch, so it is only imported when a model is actually loaded
+        if model_path is not None:
+            from ultralytics import YOLO
+            self.model = YOLO(model_path)
+        else:
+            self.model = None
+        self.tracker = None
+        self.batch_sizer = None
+
+    def get_class_names(self):
+        return self.model.names
 
-    def add_position_to_tracks(self, tracks):
+    @staticmethod
+    def add_position_to_tracks(tracks):
         for object, object_tracks in tracks.items():
             for frame_num, track in enumerate(object_tracks):
                 for track_id, track_info in track.items():
@@ -27,7 +38,10 @@ class Tracker:
                         position = get_foot_position(bbox)
                     tracks[object][frame_num][track_id]['position'] = position
 
-    def interpolate_ball_positions(self, ball_positions):
+    @staticmethod
+    def interpolate_ball_positions(ball_positions):
+        import pandas as pd
+
         ball_positions = [x.get(1, {}).get('bbox', []) for x in ball_positions]
         df_ball_positions = pd.DataFrame(ball_positions, columns=['x1', 'y1', 'x2', 'y2'])
 
@@ -38,21 +52,52 @@ class Tracker:
 
         return ball_positions
 
-    def detect_frames(self, frames):
-        batch_size = 20
-        detections = []
-        for i in range(0, len(frames), batch_size):
-            detections_batch = self.model.predict(frames[i:i + batch_size], conf=0.1)
-            detections += detections_batch
-        return detections
+    def detect_batch(self, frames):
+        import supervision as sv
+
+        with DETECTOR_BATCH_SECONDS.time():
+            detections_batch = self.model.predict(frames, conf=0.1)
+        DETECTOR_FRAMES.inc(len(detections_batch))
+        return [sv.Detections.from_ultralytics(detection) for detection in detections_batch]
+
+    def detect_frames(self, frames, progress_callback=None, batch_size=None):
+        if batch_size is not None:
+            detections = []
+            for i in range(0, len(frames), batch_size):
+                detections += self.detect_batch(frames[i:i + batch_size])
+                if progress_callback is not None:
+                    progress_callback(min(i + batch_size, len(frames)), len(frames))
+            return detections
+
+        if self.batch_sizer is None:
+            self.batch_sizer = BatchSizer()
+        return detect_in_batches(frames, measure_memory_growth(self.detect_batch), self.batch_sizer, progress_callback)
 
     def get_object_tracks(self, frames, read_from_stub=False, stub_path=None):
         if read_from_stub and stub_path is not None and os.path.exists(stub_path):
-            with open(stub_path, 'rb') as f:
-                tracks = pickle.load(f)
-            return tracks
+            if stub_path.endswith('.pkl'):
+                with open(stub_path, 'rb') as f:
+                    return pickle.load(f)
+            return load_tracks(stub_path)
 
         detections = self.detect_frames(frames)
+        tracks = self.track_detections(detections, self.get_class_names())
+
+        if stub_path is not None:
+            if stub_path.endswith('.pkl'):
+                with open(stub_path, 'wb') as f:
+                    pickle.dump(tracks, f)
+            else:
+                save_tracks(tracks, stub_path)
+
+        return tracks
+
+    def track_detections(self, detections, cls_names):
+        if self.tracker is None:
+            import supervision as sv
+            self.tracker = sv.ByteTrack()
+
+        cls_names_inv = {v: k for k, v in cls_names.items()}
 
         tracks = {
             'players': [],
@@ -60,11 +105,12 @@ class Tracker:
             'ball': []
         }
 
-        for frame_num, detection in enumerate(detections):
-            cls_names = detection.names
-            cls_names_inv = {v: k for k, v in cls_names.items()}
-
-            detection_supervision = sv.Detections.from_ultralytics(detection)
+        for frame_num, detection_supervision in enumerate(detections):
+            # a duplicated frame shares its detections object with the previous frame, so its tracks are the same
+            if frame_num > 0 and detection_supervision is detections[frame_num - 1]:
+                for object_tracks in tracks.values():
+                    object_tracks.append(copy.deepcopy(object_tracks[-1]))
+                continue
 
             for object_ind, class_id in enumerate(detection_supervision.class_id):
                 if cls_names[class_id] == 'goalkeeper':
@@ -94,10 +140,6 @@ class Tracker:
                 if cls_id == cls_names_inv['ball']:
                     tracks['ball'][frame_num][1] = {'bbox': bbox}
 
-        if stub_path is not None:
-            with open(stub_path, 'wb') as f:
-                pickle.dump(tracks, f)
-
         return tracks
 
     @staticmethod
@@ -159,7 +201,8 @@ class Tracker:
 
         return frame
 
-    def draw_team_ball_control(self, frame, frame_num, team_ball_control):
+    @staticmethod
+    def draw_team_ball_control(frame, frame_num, team_ball_control):
         overlay = frame.copy()
         cv2.rectangle(overlay, (1350, 850), (1900, 970), (255, 255, 255), -1)
         alpha = 0.4
@@ -197,7 +240,8 @@ class Tracker:
 
         return frame
 
-    def draw_annotations(self, video_frames, tracks, team_ball_control):
+    @classmethod
+    def draw_annotations(cls, video_frames, tracks, team_ball_control):
         output_video_frames = []
         for frame_num, frame in enumerate(video_frames):
             frame = frame.copy()
@@ -208,18 +252,18 @@ class Tracker:
 
             for track_id, player in player_dict.items():
                 color = player.get('team_color', (0, 0, 255))
-                frame = self.draw_ellipse(frame, player['bbox'], color, track_id)
+                frame = cls.draw_ellipse(frame, player['bbox'], color, track_id)
 
                 if player.get('has_ball', False):
-                    frame = self.draw_triangle(frame, player['bbox'], (0, 0, 255))
+                    frame = cls.draw_triangle(frame, player['bbox'], (0, 0, 255))
 
             for _, referee in referee_dict.items():
-                frame = self.draw_ellipse(frame, referee['bbox'], (0, 255, 255))
+                frame = cls.draw_ellipse(frame, referee['bbox'], (0, 255, 255))
 
             for track_id, ball in ball_dict.items():
-                frame = self.draw_triangle(frame, ball['bbox'], (0, 255, 0))
+                frame = cls.draw_triangle(frame, ball['bbox'], (0, 255, 0))
 
-            frame = self.draw_team_ball_control(frame, frame_num, team_ball_control)
+            frame = cls.draw_team_ball_control(frame, frame_num, team_ball_control)
 
             output_video_frames.append(frame)
 
@@ -1,14 +1,18 @@
 import cv2
 
 
-def read_video(video_path):
+def read_video(video_path, progress_callback=None):
     cap = cv2.VideoCapture(video_path)
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
     frames = []
     while True:
         ret, frame = cap.read()
         if not ret:
             break
         frames.append(frame)
+        if progress_callback is not None and frame_count > 0:
+            progress_callback(min(len(frames), frame_count), frame_count)
+    cap.release()
     return frames
 
 
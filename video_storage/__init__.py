@@ -0,0 +1 @@
+from .video_storage import LocalVideoStorage, ObjectVideoStorage, get_video_storage, materialize_video
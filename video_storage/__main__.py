@@ -0,0 +1,17 @@
+import argparse
+
+from database_utils import migrate_legacy_videos
+from .video_storage import get_video_storage
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Video storage maintenance')
+    parser.add_argument('command', choices=['migrate'])
+    parser.parse_args()
+
+    migrated = migrate_legacy_videos(get_video_storage())
+    print(f'Moved {migrated} videos from match_info.processed_match_video to the video storage')
+
+
+if __name__ == '__main__':
+    main()
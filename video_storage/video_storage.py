@@ -0,0 +1,169 @@
+import hashlib
+import json
+import os
+import shutil
+import uuid
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(path):
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def parse_ref(video_ref):
+    algorithm, _, digest = video_ref.partition(':')
+    if algorithm != 'sha256' or len(digest) != 64:
+        raise ValueError(f'Invalid video reference: {video_ref}')
+    return digest
+
+
+class LocalVideoStorage:
+    def __init__(self, root='video_store'):
+        self.root = root
+
+    def get_object_path(self, digest):
+        return os.path.join(self.root, digest[:2], digest[2:4], f'{digest}.mp4')
+
+    def put_file(self, path, move=False):
+        digest = hash_file(path)
+        object_path = self.get_object_path(digest)
+
+        if os.path.exists(object_path):
+            if move:
+                os.remove(path)
+        else:
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            temp_path = f'{object_path}.{uuid.uuid4().hex}.tmp'
+            if move:
+                shutil.move(path, temp_path)
+            else:
+                shutil.copyfile(path, temp_path)
+            os.replace(temp_path, object_path)
+
+        return f'sha256:{digest}'
+
+    def put_bytes(self, data):
+        digest = hashlib.sha256(data).hexdigest()
+        object_path = self.get_object_path(digest)
+
+        if not os.path.exists(object_path):
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            temp_path = f'{object_path}.{uuid.uuid4().hex}.tmp'
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, object_path)
+
+        return f'sha256:{digest}'
+
+    def exists(self, video_ref):
+        return os.path.exists(self.get_object_path(parse_ref(video_ref)))
+
+    def get_size(self, video_ref):
+        return os.path.getsize(self.get_object_path(parse_ref(video_ref)))
+
+    def get_path(self, video_ref):
+        object_path = self.get_object_path(parse_ref(video_ref))
+        return object_path if os.path.exists(object_path) else None
+
+    def read_range(self, video_ref, start, length):
+        with open(self.get_object_path(parse_ref(video_ref)), 'rb') as f:
+            f.seek(start)
+            return f.read(length)
+
+    def delete(self, video_ref):
+        object_path = self.get_object_path(parse_ref(video_ref))
+        if os.path.exists(object_path):
+            os.remove(object_path)
+
+
+class ObjectVideoStorage:
+    def __init__(self, root='object_store', bucket='processed-videos'):
+        self.bucket_path = os.path.join(root, bucket)
+
+    def get_key_path(self, digest):
+        return os.path.join(self.bucket_path, f'videos/{digest}.mp4')
+
+    def put_file(self, path, move=False):
+        digest = hash_file(path)
+        key_path = self.get_key_path(digest)
+
+        if not os.path.exists(key_path):
+            os.makedirs(os.path.dirname(key_path), exist_ok=True)
+            temp_path = f'{key_path}.{uuid.uuid4().hex}.upload'
+            shutil.copyfile(path, temp_path)
+            with open(f'{key_path}.json', 'w') as f:
+                json.dump({'content_type': 'video/mp4', 'size': os.path.getsize(temp_path)}, f)
+            os.replace(temp_path, key_path)
+
+        if move:
+            os.remove(path)
+
+        return f'sha256:{digest}'
+
+    def put_bytes(self, data):
+        digest = hashlib.sha256(data).hexdigest()
+        key_path = self.get_key_path(digest)
+
+        if not os.path.exists(key_path):
+            os.makedirs(os.path.dirname(key_path), exist_ok=True)
+            temp_path = f'{key_path}.{uuid.uuid4().hex}.upload'
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            with open(f'{key_path}.json', 'w') as f:
+                json.dump({'content_type': 'video/mp4', 'size': len(data)}, f)
+            os.replace(temp_path, key_path)
+
+        return f'sha256:{digest}'
+
+    def exists(self, video_ref):
+        return os.path.exists(self.get_key_path(parse_ref(video_ref)))
+
+    def get_size(self, video_ref):
+        with open(f'{self.get_key_path(parse_ref(video_ref))}.json') as f:
+            return json.load(f)['size']
+
+    def get_path(self, video_ref):
+        return None
+
+    def read_range(self, video_ref, start, length):
+        with open(self.get_key_path(parse_ref(video_ref)), 'rb') as f:
+            f.seek(start)
+            return f.read(length)
+
+    def delete(self, video_ref):
+        key_path = self.get_key_path(parse_ref(video_ref))
+        for path in (key_path, f'{key_path}.json'):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def materialize_video(storage, video_ref, output_path):
+    local_path = storage.get_path(video_ref)
+    if local_path is not None:
+        return local_path
+
+    size = storage.get_size(video_ref)
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    temp_path = f'{output_path}.{uuid.uuid4().hex}.tmp'
+    with open(temp_path, 'wb') as f:
+        for start in range(0, size, CHUNK_SIZE):
+            f.write(storage.read_range(video_ref, start, CHUNK_SIZE))
+    os.replace(temp_path, output_path)
+
+    return output_path
+
+
+def get_video_storage():
+    storage_type = os.getenv('video_storage', 'local')
+    root = os.getenv('video_storage_root')
+
+    if storage_type == 'local':
+        return LocalVideoStorage(root or 'video_store')
+    if storage_type == 'object':
+        return ObjectVideoStorage(root or 'object_store', os.getenv('video_storage_bucket', 'processed-videos'))
+    raise ValueError(f'Unknown video storage: {storage_type}')
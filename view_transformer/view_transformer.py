@@ -3,16 +3,19 @@ import cv2
 
 
 class ViewTransformer:
-    def __init__(self):
+    def __init__(self, pixel_vertices=None):
         court_width = 68
         court_length = 23.32
 
-        self.pixel_vertices = np.array([
-            [110, 1035],
-            [265, 275],
-            [910, 260],
-            [1640, 915]
-        ])
+        if pixel_vertices is None:
+            pixel_vertices = [
+                [110, 1035],
+                [265, 275],
+                [910, 260],
+                [1640, 915]
+            ]
+
+        self.pixel_vertices = np.array(pixel_vertices)
 
         self.target_vertices = np.array([
             [0, court_width],